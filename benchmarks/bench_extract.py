@@ -0,0 +1,72 @@
+"""
+Benchmark listing and article extraction on the saved dev.to fixtures.
+
+Compares every installed extract backend against the original approach
+(BeautifulSoup over the whole page) and checks they all return the same
+records.
+
+    python benchmarks/bench_extract.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extract
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+def baseline_listing(html):
+    """The original full-document BeautifulSoup parse"""
+    return extract._parse_listing_bs4(html)
+
+def baseline_article(html):
+    return extract._parse_article_bs4(html, blocks=False)
+
+def measure(fn, repeat):
+    fn()  # Warm up imports and caches
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    listing_html = load_fixture("latest.html")
+    article_html = load_fixture("article.html")
+
+    expected_listing = baseline_listing(listing_html)
+    expected_article = baseline_article(article_html)
+
+    rows = [(
+        "bs4 (whole page)",
+        measure(lambda: baseline_listing(listing_html), args.repeat),
+        measure(lambda: baseline_article(article_html), args.repeat),
+    )]
+    for backend in extract.BACKENDS:
+        if not extract.backend_available(backend):
+            print(f"{backend}: not installed, skipped")
+            continue
+        if extract.parse_listing(listing_html, backend=backend) != expected_listing:
+            raise SystemExit(f"{backend}: listing records differ from the baseline")
+        if extract.parse_article(article_html, backend=backend) != expected_article:
+            raise SystemExit(f"{backend}: article text differs from the baseline")
+        rows.append((
+            backend,
+            measure(lambda: extract.parse_listing(listing_html, backend=backend), args.repeat),
+            measure(lambda: extract.parse_article(article_html, backend=backend), args.repeat),
+        ))
+
+    print(f"{'backend':<18} {'listing ms':>11} {'article ms':>11} {'speedup':>8}")
+    baseline_total = rows[0][1] + rows[0][2]
+    for name, listing_ms, article_ms in rows:
+        print(f"{name:<18} {listing_ms:>11.2f} {article_ms:>11.2f} {baseline_total / (listing_ms + article_ms):>7.1f}x")
+
+if __name__ == "__main__":
+    main()
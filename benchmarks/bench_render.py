@@ -0,0 +1,135 @@
+"""
+Benchmark card rendering throughput on the bundled backgrounds.
+
+Renders original/translated card pairs through transforms.render_cards in
+batches of different sizes, with worker pools of different sizes, and
+reports cards per second next to rendering one card per worker call. The
+pipeline rows render the same cards through RenderCard steps, PIPELINE_DEPTH
+posts at a time, with the shared batcher ("pipeline") and with one card per
+worker call under a per-worker stage limit ("pipeline 1x1").
+
+    python benchmarks/bench_render.py [--cards 48] [--batch-sizes 1 4 16]
+        [--workers 1 2 4]
+"""
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import offload
+import pipeline
+import transforms
+from card_renderer import CardJob, list_backgrounds, render_card
+from transforms import RenderCard, render_cards
+
+BACKGROUNDS_DIR = os.path.join(REPO_DIR, "background_images")
+ORIGINAL_TEXT = "Rendering cards for every new post is CPU-bound work that runs in the worker pool. " * 12
+TRANSLATED_TEXT = "رندر کردن کارت برای هر پست جدید کاری پردازشی است که در مخزن پردازش‌ها اجرا می‌شود. " * 12
+
+def make_jobs(count):
+    """Original and translated cards of count // 2 posts, each pair on one background"""
+    backgrounds = list_backgrounds(BACKGROUNDS_DIR)
+    jobs = []
+    for index in range(count):
+        background = backgrounds[index // 2 % len(backgrounds)]
+        title = f"Post number {index // 2} about batch rendering"
+        if index % 2:
+            jobs.append(CardJob(TRANSLATED_TEXT, background, f"ترجمه: {title}", True))
+        else:
+            jobs.append(CardJob(ORIGINAL_TEXT, background, title))
+    return jobs
+
+async def one_by_one(jobs):
+    """Every card in its own worker call, as many in flight as there are workers"""
+    semaphore = asyncio.Semaphore(offload.CPU_WORKERS)
+
+    async def render(job):
+        async with semaphore:
+            return await offload.run_cpu(render_card, BACKGROUNDS_DIR, job.text_content, job.background_image_path,
+                                         job.title, job.is_translation)
+
+    await asyncio.gather(*(render(job) for job in jobs))
+
+async def batched(jobs, batch_size):
+    for start in range(0, len(jobs), batch_size):
+        cards = await render_cards(BACKGROUNDS_DIR, jobs[start:start + batch_size])
+        errors = [card.error for card in cards if card.error]
+        if errors:
+            raise RuntimeError(errors[0])
+
+async def through_pipeline(jobs, per_card=False):
+    """
+    Both cards of each post rendered by concurrent RenderCard steps, as in
+    scrap2. per_card renders one card per worker call with one card per
+    worker in flight, as before rendering was batched.
+    """
+    transforms._render_batchers.clear()
+    batch_size = transforms.RENDER_BATCH_SIZE
+    original = RenderCard(BACKGROUNDS_DIR, "text", "original_image", name="render_original")
+    translated = RenderCard(BACKGROUNDS_DIR, "translation", "translated_image", is_translation=True,
+                            name="render_translation")
+    if per_card:
+        transforms.RENDER_BATCH_SIZE = 1
+        for step in (original, translated):
+            step.limit_name, step.concurrency = "render", offload.CPU_WORKERS
+    window = asyncio.Semaphore(pipeline.PIPELINE_DEPTH)
+
+    async def prepare(index):
+        job = jobs[2 * index]
+        post = pipeline.Post(f"post-{index}", job.title, "", datetime.now(timezone.utc), data={
+            "text": job.text_content, "translation": jobs[2 * index + 1].text_content,
+            "background": job.background_image_path,
+        })
+        async with window:
+            if not all(await asyncio.gather(original(post), translated(post))):
+                raise RuntimeError(f"Rendering post {index} failed")
+
+    try:
+        await asyncio.gather(*(prepare(index) for index in range(len(jobs) // 2)))
+    finally:
+        transforms.RENDER_BATCH_SIZE = batch_size
+        transforms._render_batchers.clear()
+
+async def measure(workers, jobs, batch_sizes):
+    offload.CPU_WORKERS = workers
+    offload.EXECUTION_MODE = "process"
+    try:
+        # Warm up: start every worker and load its templates and fonts
+        await batched(make_jobs(2 * workers), 2 * workers)
+        rows = []
+        start = time.perf_counter()
+        await one_by_one(jobs)
+        rows.append(("one by one", len(jobs) / (time.perf_counter() - start)))
+        for batch_size in batch_sizes:
+            start = time.perf_counter()
+            await batched(jobs, batch_size)
+            rows.append((f"batch {batch_size}", len(jobs) / (time.perf_counter() - start)))
+        for mode, per_card in (("pipeline 1x1", True), ("pipeline", False)):
+            start = time.perf_counter()
+            await through_pipeline(jobs, per_card)
+            rows.append((mode, len(jobs) // 2 * 2 / (time.perf_counter() - start)))
+        return rows
+    finally:
+        offload.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", type=int, default=48)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, max(1, (os.cpu_count() or 1) // 2), os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.cards)
+    print(f"{'workers':>7}  {'mode':<12} {'cards/s':>8}")
+    for workers in args.workers:
+        for mode, rate in asyncio.run(measure(workers, jobs, args.batch_sizes)):
+            print(f"{workers:>7}  {mode:<12} {rate:>8.1f}")
+
+if __name__ == "__main__":
+    main()
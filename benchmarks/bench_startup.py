@@ -0,0 +1,84 @@
+"""
+Measure cold start of the scripts: import time and a run that finds no new posts.
+
+For every flow this reports the total import time of the script module (from
+python -X importtime), the slowest modules it pulls in, and the wall time of a
+full run against the stub server when no article is new.
+
+    python benchmarks/bench_startup.py [--top 10] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import stub_server
+from run_benchmarks import FLOWS, flow_env
+
+def import_profile(script, env):
+    """(total import microseconds, [(cumulative us, module)] of top-level imports)"""
+    code = (
+        "import importlib.util, sys; sys.path.insert(0, '.'); "
+        f"spec = importlib.util.spec_from_file_location('flow', {script!r}); "
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))"
+    )
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR, env=env,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        errors = "\n".join(line for line in completed.stderr.splitlines() if not line.startswith("import time:"))
+        raise SystemExit(f"{script}: import failed\n{errors[-2000:]}")
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        # Top-level imports are the ones without extra indentation
+        if not name.startswith("  ") and name.strip():
+            modules.append((int(cumulative_us), name.strip()))
+    return sum(us for us, _ in modules), sorted(modules, reverse=True)
+
+def zero_post_run(script, env):
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, script], cwd=REPO_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise SystemExit(f"{script}: run failed\n{completed.stderr[-2000:]}")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list per flow")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    server, base_url = stub_server.make_server(articles=0, latency_scale=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for name, flow in FLOWS.items():
+            with tempfile.TemporaryDirectory(prefix="bench-") as state_dir:
+                env = flow_env(base_url, state_dir)
+                try:
+                    profiles = [import_profile(flow["script"], env) for _ in range(args.repeat)]
+                    runs = [zero_post_run(flow["script"], env) for _ in range(args.repeat)]
+                except SystemExit as e:
+                    print(f"\n== {name} ==\n{e}")
+                    continue
+            total_us, modules = min(profiles)
+            print(f"\n== {name} ==")
+            print(f"import {total_us / 1000:.1f} ms, zero-post run {statistics.median(runs) * 1000:.0f} ms (median of {args.repeat})")
+            for cumulative_us, module in modules[:args.top]:
+                print(f"  {cumulative_us / 1000:>8.1f} ms  {module}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Generate the synthetic fixtures served by the benchmarks' stub server.
+
+Nothing here is recorded from dev.to (live pages cannot be fetched from the
+benchmark environment): pages and JSON are built from a seeded RNG. The HTML
+pages follow the markup of https://dev.to/latest and of an article
+page (head with inline scripts and styles, navigation, sidebars, story cards,
+article body with code blocks, comment thread) at a realistic size. The JSON
+fixtures follow the dev.to /api/articles and comments responses and the
+pollinations chat completion format. Output is deterministic so benchmark runs
+are comparable across commits.
+
+    python benchmarks/fixtures/generate.py
+"""
+from datetime import datetime, timedelta, timezone
+import html
+import io
+import json
+import os
+import random
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+# Timestamps are written relative to this moment; stub_server.py shifts them
+# to the time of each request
+FIXTURE_NOW = datetime(2025, 6, 26, 16, 30, tzinfo=timezone.utc)
+STORY_COUNT = 30
+
+WORDS = (
+    "python async await event loop latency throughput cache render translate "
+    "article developer deploy container kubernetes docker database index query "
+    "performance memory allocation parser stream buffer socket connection pool "
+    "request response header payload token budget scheduler queue worker thread "
+    "process benchmark profile optimize refactor module package function class"
+).split()
+TAGS = ["python", "javascript", "webdev", "programming", "devops", "ai", "beginners", "tutorial", "rust", "go"]
+
+SVG_ICON = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" role="img" class="crayons-icon">'
+    '<path d="M12 2c5.523 0 10 4.477 10 10s-4.477 10-10 10S2 17.523 2 12 6.477 2 12 2zm0 2a8 8 0 100 '
+    '16 8 8 0 000-16zm0 3a1 1 0 011 1v3h3a1 1 0 010 2h-3v3a1 1 0 01-2 0v-3H8a1 1 0 010-2h3V8a1 1 0 011-1z"/>'
+    '</svg>'
+)
+
+def sentence(rng, low=8, high=20):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(low, high))]
+    return " ".join(words).capitalize() + "."
+
+def paragraph(rng, sentences=4):
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+def page_head(rng, title):
+    config = {f"key_{i}": sentence(rng, 3, 6) for i in range(400)}
+    styles = "\n".join(f".crayons-util-{i} {{ margin: {i % 16}px; padding: {i % 8}px; }}" for i in range(600))
+    return (
+        '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8">'
+        f'<title>{html.escape(title)} - DEV Community</title>'
+        + "".join(f'<meta name="meta-{i}" content="{html.escape(sentence(rng))}">' for i in range(40))
+        + "".join(f'<link rel="preload" href="/assets/chunk-{i}.js" as="script">' for i in range(30))
+        + f'<style>{styles}</style>'
+        + f'<script>window.__CONFIG__ = {config!r};</script>'
+        + '</head><body class="default default-article-body">'
+    )
+
+def page_nav(rng):
+    links = "".join(
+        f'<li><a href="/t/{tag}" class="crayons-link crayons-link--block">{SVG_ICON}#{tag}</a></li>'
+        for tag in TAGS * 3
+    )
+    return (
+        '<header class="crayons-header"><div class="crayons-header__container">'
+        f'<a href="/" class="site-logo">{SVG_ICON}</a>'
+        '<form class="crayons-header--search"><input type="text" name="q" placeholder="Search..."></form>'
+        '</div></header>'
+        f'<aside class="sidebar-left"><nav><ul class="default-navigation-links">{links}</ul></nav></aside>'
+    )
+
+def page_footer(rng):
+    scripts = "".join(f'<script src="/assets/bundle-{i}.js" defer></script>' for i in range(20))
+    return (
+        f'<footer class="crayons-footer"><p>{paragraph(rng, 3)}</p></footer>'
+        f'{scripts}<script>window.trackingData = {[sentence(rng) for _ in range(100)]!r};</script>'
+        '</body></html>'
+    )
+
+def story_card(rng, index, published_at):
+    title = sentence(rng, 4, 10).rstrip('.')
+    slug = "-".join(title.lower().split()[:6])
+    author = f"author{rng.randint(1, 500)}"
+    tags = "".join(
+        f'<a class="crayons-tag crayons-tag--monochrome" href="/t/{tag}"><span class="crayons-tag__prefix">#</span>{tag}</a>'
+        for tag in rng.sample(TAGS, 4)
+    )
+    return (
+        f'<div class="crayons-story " data-feed-content-id="{2000000 + index}" data-content-user-id="{rng.randint(1, 10 ** 6)}">'
+        f'<a href="/{author}/{slug}-{index}" aria-labelledby="article-link-{index}" class="crayons-story__hidden-navigation-link">{html.escape(title)}</a>'
+        '<div role="presentation"><div class="crayons-story__body"><div class="crayons-story__top">'
+        '<div class="crayons-story__meta"><div class="crayons-story__author-pic">'
+        f'<a href="/{author}" class="crayons-avatar crayons-avatar--l"><img src="https://media2.dev.to/dynamic/image/width=90,height=90/avatar-{index}.png" alt="{author} profile" class="crayons-avatar__image" loading="lazy"></a>'
+        f'</div><div><div><a href="/{author}" class="crayons-story__secondary fw-medium">{author}</a></div>'
+        f'<a href="/{author}/{slug}-{index}" class="crayons-story__tertiary fs-xs">'
+        f'<time datetime="{published_at.isoformat().replace("+00:00", "Z")}">{published_at:%b %d}</time>'
+        '<span class="time-ago-indicator-initial-placeholder"></span></a></div></div></div>'
+        '<div class="crayons-story__indention">'
+        f'<h2 class="crayons-story__title crayons-story__title-full_post"><a href="/{author}/{slug}-{index}" data-preload-image="" id="article-link-{index}">\n      {html.escape(title)}\n    </a></h2>'
+        f'<div class="crayons-story__tags">{tags}</div>'
+        '<div class="crayons-story__bottom"><div class="crayons-story__details">'
+        f'<a href="/{author}/{slug}-{index}" class="crayons-btn crayons-btn--s crayons-btn--ghost">{SVG_ICON}'
+        f'<span class="aggregate_reactions_counter">{rng.randint(0, 50)}<span class="hidden s:inline">&nbsp;reactions</span></span></a>'
+        f'<a href="/{author}/{slug}-{index}#comments" class="crayons-btn crayons-btn--s crayons-btn--ghost">{SVG_ICON}'
+        f'{rng.randint(0, 20)}<span class="hidden s:inline">&nbsp;comments</span></a></div>'
+        f'<div class="crayons-story__save"><small class="crayons-story__tertiary fs-xs mr-2">{rng.randint(1, 15)} min read</small>'
+        f'<button type="button" class="crayons-btn crayons-btn--secondary crayons-btn--icon-left fs-s bookmark-button">{SVG_ICON}Save</button></div>'
+        '</div></div></div></div></div>'
+    )
+
+def listing_page(rng):
+    cards = "".join(
+        story_card(rng, index, FIXTURE_NOW - timedelta(minutes=3 * index + rng.randint(0, 2)))
+        for index in range(STORY_COUNT)
+    )
+    sidebar = "".join(f'<div class="crayons-card crayons-card--secondary"><h3>{sentence(rng, 2, 4)}</h3><p>{paragraph(rng, 2)}</p></div>' for _ in range(15))
+    return (
+        page_head(rng, "Latest")
+        + page_nav(rng)
+        + '<main id="main-content"><div class="articles-list" id="articles-list"><div class="substories" id="substories">'
+        + cards
+        + '</div></div></main>'
+        + f'<aside class="sidebar-right">{sidebar}</aside>'
+        + page_footer(rng)
+    )
+
+def code_block(rng):
+    lines = []
+    for _ in range(rng.randint(6, 18)):
+        tokens = "".join(
+            f'<span class="{rng.choice(["k", "n", "nf", "s1", "o", "p", "mi"])}">{rng.choice(WORDS)}</span> '
+            for _ in range(rng.randint(3, 8))
+        )
+        lines.append(tokens)
+    return f'<div class="highlight js-code-highlight"><pre class="highlight python"><code>{chr(10).join(lines)}</code></pre></div>'
+
+def article_body(rng):
+    parts = []
+    for section in range(8):
+        parts.append(f'<h2><a name="section-{section}" href="#section-{section}"></a>{sentence(rng, 3, 7)}</h2>')
+        for _ in range(rng.randint(3, 6)):
+            parts.append(f'<p>{paragraph(rng, rng.randint(2, 6))} <code>{rng.choice(WORDS)}()</code> <a href="https://example.com/{section}">{rng.choice(WORDS)}</a></p>')
+        if section % 2 == 0:
+            parts.append(code_block(rng))
+        if section % 3 == 1:
+            items = "".join(f'<li>{sentence(rng, 5, 12)}</li>' for _ in range(rng.randint(3, 6)))
+            parts.append(f'<ul>{items}</ul>')
+        if section == 2:
+            parts.append(f'<p><a href="https://media2.dev.to/figure-{section}.png" class="article-body-image-wrapper"><img src="https://media2.dev.to/dynamic/image/width=800/figure-{section}.png" alt="figure" loading="lazy"></a></p>')
+    return "".join(parts)
+
+def comment(rng, index, depth=0):
+    replies = "".join(comment(rng, index * 10 + i, depth + 1) for i in range(rng.randint(0, 2))) if depth < 2 else ""
+    return (
+        f'<details class="comment-wrapper comment-wrapper--deep-{depth}" open><summary>{SVG_ICON}</summary>'
+        f'<div class="comment__inner" id="comment-node-{index}"><div class="comment__details">'
+        f'<a href="/user{index}" class="comment__author">user{index}</a><time datetime="2025-06-26T12:00:00Z">Jun 26</time></div>'
+        f'<div class="comment__body text-styles body">{"".join(f"<p>{paragraph(rng, 2)}</p>" for _ in range(rng.randint(1, 3)))}</div>'
+        f'<footer class="comment__footer">{SVG_ICON}<button class="crayons-btn crayons-btn--ghost">Like</button></footer></div>'
+        f'{replies}</details>'
+    )
+
+def article_page(rng):
+    title = sentence(rng, 5, 9).rstrip('.')
+    comments = "".join(comment(rng, index) for index in range(25))
+    more = "".join(f'<a class="crayons-link" href="/more/{i}"><h4>{sentence(rng, 4, 8)}</h4></a>' for i in range(20))
+    return (
+        page_head(rng, title)
+        + page_nav(rng)
+        + '<main id="main-content"><div class="article-wrapper"><article class="crayons-card crayons-article mb-4" id="article-show-container">'
+        + '<header class="crayons-article__header" id="main-title">'
+        + '<div class="crayons-article__cover"><img src="https://media2.dev.to/dynamic/image/width=1000,height=420/cover.png" width="1000" height="420" class="crayons-article__cover__image" alt="Cover image"></div>'
+        + f'<div class="crayons-article__header__meta"><h1 class="fs-3xl">{html.escape(title)}</h1></div></header>'
+        + '<div class="crayons-article__main"><div class="crayons-article__body text-styles spec__body" data-article-id="2000000" id="article-body">'
+        + article_body(rng)
+        + '</div></div></article>'
+        + f'<section id="comments" class="text-padding mb-4 crayons-card comments">{comments}</section>'
+        + f'<section class="crayons-card crayons-card--secondary">{more}</section>'
+        + '</div></main>'
+        + page_footer(rng)
+    )
+
+PERSIAN_WORDS = (
+    "برنامه نویسی پایتون حافظه سرعت کش ترجمه مقاله توسعه دهنده سرور پایگاه داده "
+    "کارایی صف پردازش شبکه درخواست پاسخ زمان بندی بهینه سازی کتابخانه تابع کلاس"
+).split()
+
+def persian_paragraph(rng, words=60):
+    return " ".join(rng.choice(PERSIAN_WORDS) for _ in range(words)) + "."
+
+def api_articles(rng):
+    """Response of /api/articles?state=fresh, newest first"""
+    articles = []
+    for index in range(10):
+        published_at = FIXTURE_NOW - timedelta(minutes=3 * index + rng.randint(0, 2))
+        title = sentence(rng, 4, 10).rstrip('.')
+        slug = "-".join(title.lower().split()[:6]) + f"-{index}"
+        tags = rng.sample(TAGS, 4)
+        articles.append({
+            "type_of": "article",
+            "id": 2100000 + index,
+            "title": title,
+            "description": paragraph(rng, 2),
+            "readable_publish_date": f"{published_at:%b %d}",
+            "slug": slug,
+            "path": f"/author{index}/{slug}",
+            "url": f"https://dev.to/author{index}/{slug}",
+            "comments_count": rng.randint(0, 20),
+            "public_reactions_count": rng.randint(0, 80),
+            "positive_reactions_count": rng.randint(0, 80),
+            "cover_image": f"https://media2.dev.to/dynamic/image/width=1000,height=420/cover-{index}.png" if index % 3 else None,
+            "published_at": published_at.isoformat().replace("+00:00", "Z"),
+            "reading_time_minutes": rng.randint(1, 15),
+            "tag_list": tags,
+            "tags": ", ".join(tags),
+            "user": {"name": f"Author {index}", "username": f"author{index}"},
+        })
+    return articles
+
+def api_comments(rng):
+    """Response of /api/articles/{id}/comments"""
+    return [{
+        "type_of": "comment",
+        "id_code": f"c{index:04x}",
+        "created_at": "2025-06-26T12:00:00Z",
+        "body_html": f"<p>{paragraph(rng, 2)}</p>",
+        "positive_reactions_count": rng.randint(0, 30),
+        "user": {"name": f"User {index}", "username": f"user{index}"},
+        "children": [],
+    } for index in range(12)]
+
+def chat_completion(content):
+    return {
+        "id": "chatcmpl-fixture",
+        "object": "chat.completion",
+        "model": "openai",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+def cover_image():
+    """A gradient JPEG the size of a dev.to cover image"""
+    from PIL import Image
+    image = Image.linear_gradient("L").resize((1000, 420)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+def main():
+    rng = random.Random(20250626)
+    fixtures = {
+        "latest.html": listing_page(rng),
+        "article.html": article_page(rng),
+        "articles.json": json.dumps(api_articles(rng), ensure_ascii=False, indent=1),
+        "comments.json": json.dumps(api_comments(rng), ensure_ascii=False, indent=1),
+        "translation.json": json.dumps(chat_completion(
+            "\n\n".join(persian_paragraph(rng) for _ in range(12))
+        ), ensure_ascii=False, indent=1),
+        "summary.json": json.dumps(chat_completion(
+            "\n".join(persian_paragraph(rng, 15) for _ in range(4))
+        ), ensure_ascii=False, indent=1),
+        "cover.jpg": cover_image(),
+    }
+    for name, content in fixtures.items():
+        path = os.path.join(FIXTURES_DIR, name)
+        if isinstance(content, bytes):
+            with open(path, 'wb') as f:
+                f.write(content)
+        else:
+            content = content.encode('utf-8')
+            with open(path, 'wb') as f:
+                f.write(content)
+        print(f"Wrote {path} ({len(content)} bytes)")
+
+if __name__ == "__main__":
+    main()
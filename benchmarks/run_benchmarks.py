@@ -0,0 +1,239 @@
+"""
+Benchmark the scrap2, scrapbyapi and photo+textPers flows offline.
+
+Each flow runs once, end to end, in its own process against the local stub
+server (see stub_server.py), which serves synthetic fixtures generated by
+fixtures/generate.py, with a fresh seen-index, translation cache and
+similarity index.
+Reported per flow:
+  - latency of every stage (count, mean, p50, p95, max in ms)
+  - throughput in published articles per minute
+  - peak RSS of the flow process and of its worker processes
+  - peak traced memory, from a second run under tracemalloc (only the flow
+    process is traced, not the CPU workers), and the memory blocks still
+    allocated when that run ends (sys.getallocatedblocks)
+
+Telegram send pacing (send_scheduler) is part of the measured time.
+
+    python benchmarks/run_benchmarks.py [--flows scrap2 ...] [--articles 5]
+        [--latency-scale 1.0] [--skip-allocations] [--json results.json]
+"""
+import argparse
+import asyncio
+import functools
+import importlib.util
+import inspect
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[:0] = [REPO_DIR, BENCHMARKS_DIR]
+
+import stub_server
+
+# Every flow script builds a pipeline.Pipeline as module-level PIPELINE and
+# runs it from its async main()
+FLOWS = {
+    "scrap2": {"script": "scrap2.py"},
+    "scrapbyapi": {"script": "scrapbyapi.py"},
+    "photo+textPers": {"script": "photo+textPers.py"},
+}
+
+# --- Worker side: runs one flow in this process ---
+
+def timed(fn, samples, published=None):
+    """Wrap a stage function to record its duration and truthy results"""
+    def record(start, result):
+        samples.append(time.perf_counter() - start)
+        if published is not None and result:
+            published.append(1)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = await fn(*args, **kwargs)
+                return result
+            finally:
+                record(start, result)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            finally:
+                record(start, result)
+    return wrapper
+
+def load_flow(name):
+    """Import a flow script as a module; some names are not valid identifiers"""
+    path = os.path.join(REPO_DIR, FLOWS[name]["script"])
+    spec = importlib.util.spec_from_file_location(name.replace('+', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def summarize(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, max(0, round(0.95 * len(ordered)) - 1))
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[p95_index] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def run_worker(name, trace):
+    """Run a flow once and return its measurements"""
+    if trace:
+        tracemalloc.start()
+
+    module = load_flow(name)
+    flow = module.PIPELINE
+    # Stages are the source fetch, every transform (by name), the sink and
+    # the whole run; the sink's successful sends count as published
+    samples = {}
+    published = []
+
+    def instrument(obj, method, stage, counts=None):
+        setattr(obj, method, timed(getattr(obj, method), samples.setdefault(stage, []), counts))
+
+    instrument(flow.source, "fetch", f"source:{flow.source.name}")
+    for step in flow.steps:
+        for transform in step if isinstance(step, tuple) else (step,):
+            instrument(transform, "apply", transform.name)
+    instrument(flow.sink, "send", f"sink:{flow.sink.name}", published)
+    instrument(flow, "run", "run")
+
+    entry = module.main
+    start = time.perf_counter()
+    if inspect.iscoroutinefunction(entry):
+        asyncio.run(entry())
+    else:
+        entry()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "flow": name,
+        "elapsed_s": elapsed,
+        "published": len(published),
+        "articles_per_min": len(published) / elapsed * 60 if elapsed else 0.0,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "workers_peak_rss_mib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "stages": {stage: summarize(values) for stage, values in samples.items()},
+    }
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["traced_peak_mib"] = peak / (1024 * 1024)
+        # Blocks still alive at the end of the run, not the number of allocations
+        result["live_blocks"] = sys.getallocatedblocks()
+    return result
+
+# --- Parent side: serves the fixtures and spawns one worker per flow ---
+
+def flow_env(base_url, state_dir):
+    env = dict(os.environ)
+    env.update({
+        "BOT_TOKEN": "123456:bench",
+        "CHANNEL_ID": "-1001234567890",
+        "DEVTO_BASE_URL": base_url,
+        "POLLINATIONS_TEXT_URL": base_url,
+        "POLLINATIONS_IMAGE_URL": base_url,
+        "TELEGRAM_API_URL": base_url,
+        "SEEN_INDEX_PATH": os.path.join(state_dir, "seen_index.sqlite3"),
+        "TRANSLATION_CACHE_PATH": os.path.join(state_dir, "translation_cache.sqlite3"),
+        "SIMILARITY_INDEX_PATH": os.path.join(state_dir, "similarity_index.sqlite3"),
+        "HEDGE_LATENCY_PATH": os.path.join(state_dir, "hedge_latency.json"),
+    })
+    return env
+
+def spawn_worker(name, base_url, trace):
+    with tempfile.TemporaryDirectory(prefix="bench-") as state_dir:
+        output_path = os.path.join(state_dir, "result.json")
+        command = [sys.executable, os.path.abspath(__file__), "--worker", name, "--output", output_path]
+        if trace:
+            command.append("--trace")
+        completed = subprocess.run(command, cwd=REPO_DIR, env=flow_env(base_url, state_dir),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0 or not os.path.exists(output_path):
+            print(f"{name}: benchmark run failed\n{completed.stderr[-2000:]}", file=sys.stderr)
+            return None
+        with open(output_path) as f:
+            return json.load(f)
+
+def print_report(results):
+    for result in results:
+        print(f"\n== {result['flow']} ==")
+        print(f"published {result['published']} in {result['elapsed_s']:.2f}s "
+              f"({result['articles_per_min']:.1f} articles/min), "
+              f"peak RSS {result['peak_rss_mib']:.1f} MiB (workers {result['workers_peak_rss_mib']:.1f} MiB)")
+        if "traced_peak_mib" in result:
+            print(f"traced peak {result['traced_peak_mib']:.1f} MiB, {result['live_blocks']} live blocks at exit")
+        print(f"{'stage':<38} {'count':>5} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+        for stage, stats in result["stages"].items():
+            if not stats["count"]:
+                print(f"{stage:<38} {0:>5}")
+                continue
+            print(f"{stage:<38} {stats['count']:>5} {stats['mean_ms']:>9.1f} {stats['p50_ms']:>9.1f} "
+                  f"{stats['p95_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flows", nargs="+", choices=list(FLOWS), default=list(FLOWS))
+    parser.add_argument("--articles", type=int, default=5, help="New articles each flow should publish")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for the modeled service latency")
+    parser.add_argument("--skip-allocations", action="store_true", help="Skip the tracemalloc run")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--worker", choices=list(FLOWS), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, args.trace)
+        with open(args.output, 'w') as f:
+            json.dump(result, f)
+        return
+
+    server, base_url = stub_server.make_server(articles=args.articles, latency_scale=args.latency_scale)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    results = []
+    try:
+        for name in args.flows:
+            print(f"Running {name}...", file=sys.stderr)
+            result = spawn_worker(name, base_url, trace=False)
+            if result is None:
+                continue
+            if not args.skip_allocations and (traced := spawn_worker(name, base_url, trace=True)):
+                result["traced_peak_mib"] = traced["traced_peak_mib"]
+                result["live_blocks"] = traced["live_blocks"]
+            results.append(result)
+    finally:
+        server.shutdown()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"articles": args.articles, "latency_scale": args.latency_scale, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Local stand-in for dev.to, pollinations.ai and the Telegram Bot API.
+
+Serves the synthetic fixtures (see fixtures/generate.py, built from a seeded
+RNG rather than recorded) with a modeled per-route latency so the scripts
+can be benchmarked offline. Point them at it with DEVTO_BASE_URL,
+POLLINATIONS_TEXT_URL, POLLINATIONS_IMAGE_URL and TELEGRAM_API_URL.
+
+Timestamps in the listing and API fixtures are shifted on every request so
+that exactly `articles` posts are recent enough to be picked up; the rest are
+a day old. Every article path gets its own variant of the article fixture,
+so the posts of a run are not near-duplicates of each other. Listings carry
+a fixed ETag and answer a matching If-None-Match with 304, and /api/articles
+honors per_page and page.
+
+    python benchmarks/stub_server.py [--port 8765] [--articles 5] [--latency-scale 1.0]
+"""
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MEDIA_HOST = "https://media2.dev.to"
+
+# Median latencies of the real services, in seconds
+ROUTE_LATENCY = {
+    "listing": 0.35,
+    "article": 0.25,
+    "api_articles": 0.30,
+    "comments": 0.20,
+    "translation": 2.5,
+    "summary": 1.5,
+    "image_generation": 4.0,
+    "media": 0.15,
+    "telegram": 0.30,
+}
+
+DATETIME_ATTR = re.compile(r'datetime="([^"]+)"')
+TEXT_NODE = re.compile(rb">[^<]+<")
+WORD = re.compile(rb"[A-Za-z]{3,}")
+BATCH_MARKER = re.compile(r"\[\[(\d+)\]\]")
+MEDIA_TYPE = re.compile(rb'"type":\s*"photo"')
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+def shifted_timestamps(count, recent):
+    """Newest first: `recent` timestamps a minute apart ending now, then day-old ones"""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    return [now - timedelta(minutes=index) if index < recent else now - timedelta(days=1, minutes=index)
+            for index in range(count)]
+
+class StubState:
+    """Fixtures and counters shared by the request handlers"""
+
+    def __init__(self, base_url, articles=5, latency_scale=1.0):
+        self.base_url = base_url
+        self.articles = articles
+        self.latency_scale = latency_scale
+        self.listing = load_fixture("latest.html").decode('utf-8').replace(MEDIA_HOST, base_url)
+        self.article = load_fixture("article.html").replace(MEDIA_HOST.encode(), base_url.encode())
+        self.api_articles = json.loads(load_fixture("articles.json"))
+        self.comments = load_fixture("comments.json")
+        self.translation = load_fixture("translation.json")
+        self.summary = load_fixture("summary.json")
+        self.image = load_fixture("cover.jpg")
+        self.etag = '"' + hashlib.sha256(self.listing.encode('utf-8') + str(articles).encode()).hexdigest()[:16] + '"'
+        self.article_pages = {}
+        self.message_ids = itertools.count(1)
+        self.requests = {route: 0 for route in ROUTE_LATENCY}
+        self.lock = threading.Lock()
+
+    def article_page(self, path):
+        """The article fixture with every fourth word of its text marked by the path"""
+        with self.lock:
+            if path not in self.article_pages:
+                mark = hashlib.sha256(path.encode('utf-8')).hexdigest()[:4].encode()
+                words = itertools.count()
+
+                def mark_words(match):
+                    return WORD.sub(lambda word: word[0] + mark if next(words) % 4 == 0 else word[0], match[0])
+
+                self.article_pages[path] = TEXT_NODE.sub(mark_words, self.article)
+            return self.article_pages[path]
+
+    def count(self, route):
+        with self.lock:
+            self.requests[route] += 1
+
+    def listing_page(self):
+        timestamps = iter(shifted_timestamps(self.listing.count('datetime="'), self.articles))
+        return DATETIME_ATTR.sub(lambda m: f'datetime="{next(timestamps).isoformat()}"', self.listing).encode('utf-8')
+
+    def articles_json(self, query):
+        articles = [dict(article) for article in self.api_articles]
+        for article, published_at in zip(articles, shifted_timestamps(len(articles), self.articles)):
+            article["published_at"] = published_at.isoformat().replace("+00:00", "Z")
+            if article.get("cover_image"):
+                article["cover_image"] = article["cover_image"].replace(MEDIA_HOST, self.base_url)
+        params = parse_qs(query)
+        per_page = int(params.get("per_page", ["30"])[0])
+        page = int(params.get("page", ["1"])[0])
+        return json.dumps(articles[(page - 1) * per_page:page * per_page]).encode('utf-8')
+
+    def summary_json(self, body):
+        """One summary per [[n]] item of a batched request, else a single one"""
+        try:
+            prompt = json.loads(body)["messages"][-1]["content"]
+        except (ValueError, KeyError, IndexError):
+            return self.summary
+        markers = sorted({int(marker) for marker in BATCH_MARKER.findall(prompt)})
+        if not markers:
+            return self.summary
+        completion = json.loads(self.summary)
+        text = completion["choices"][0]["message"]["content"]
+        completion["choices"][0]["message"]["content"] = "\n\n".join(f"[[{marker}]] {text}" for marker in markers)
+        return json.dumps(completion, ensure_ascii=False).encode('utf-8')
+
+    def telegram_message(self, photo=False):
+        message = {
+            "message_id": next(self.message_ids),
+            "date": int(time.time()),
+            "chat": {"id": -1001234567890, "type": "channel", "title": "bench"},
+        }
+        if photo:
+            file_id = f"AgAD{message['message_id']}"
+            message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 1080, "height": 1080}]
+        return message
+
+    def telegram_result(self, method, body):
+        if method == "sendMediaGroup":
+            result = [self.telegram_message(photo=True) for _ in MEDIA_TYPE.findall(body)]
+        elif method == "sendPhoto":
+            result = self.telegram_message(photo=True)
+        elif method == "getMe":
+            result = {"id": 123, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        else:
+            result = self.telegram_message()
+        return json.dumps({"ok": True, "result": result}).encode('utf-8')
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # Set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def route(self, body):
+        path, query = urlsplit(self.path)[2:4]
+        if path.startswith('/bot'):
+            return "telegram", 'application/json', lambda: self.state.telegram_result(path.rsplit('/', 1)[-1], body)
+        if path == '/latest':
+            return "listing", 'text/html; charset=utf-8', self.state.listing_page
+        if path == '/api/articles':
+            return "api_articles", 'application/json', lambda: self.state.articles_json(query)
+        if path.startswith('/api/articles/') and path.endswith('/comments'):
+            return "comments", 'application/json', lambda: self.state.comments
+        if path.startswith('/prompt/'):
+            return "image_generation", 'image/jpeg', lambda: self.state.image
+        if path.startswith('/dynamic/image/') or path.endswith(('.png', '.jpg', '.jpeg')):
+            return "media", 'image/jpeg', lambda: self.state.image
+        if self.command == 'POST' and path == '/openai':
+            return "summary", 'application/json', lambda: self.state.summary_json(body)
+        if self.command == 'POST' and path == '/':
+            return "translation", 'application/json', lambda: self.state.translation
+        if self.command == 'GET' and path.count('/') == 2:
+            return "article", 'text/html; charset=utf-8', lambda: self.state.article_page(path)
+        return None, None, None
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        request_body = self.rfile.read(length) if length else b''
+
+        route, content_type, body = self.route(request_body)
+        if route is None:
+            self.send_error(404)
+            return
+        self.state.count(route)
+        time.sleep(ROUTE_LATENCY[route] * self.state.latency_scale)
+
+        if route in ("listing", "api_articles") and self.headers.get('If-None-Match') == self.state.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.state.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        payload = body()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if route in ("listing", "api_articles"):
+            self.send_header('ETag', self.state.etag)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = respond
+    do_POST = respond
+
+def make_server(port=0, articles=5, latency_scale=1.0):
+    """Create a stub server on localhost; port 0 picks a free port"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    StubHandler.state = StubState(base_url, articles, latency_scale)
+    return server, base_url
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--articles", type=int, default=5)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server, base_url = make_server(args.port, args.articles, args.latency_scale)
+    print(f"Serving fixtures on {base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+from dataclasses import dataclass
+import functools
+import io
+import logging
+import os
+import threading
+import time
+
+import text_layout
+
+logger = logging.getLogger(__name__)
+
+# Pillow is imported where it is used: the parent process only needs the
+# picklable render_card entry point, the CPU workers do the drawing.
+
+# --- Card Layout Settings ---
+# Title and text are laid out with text_layout at the largest font size
+# (between the MIN and the MAX) that fits the card; text that does not fit
+# even at the smallest size is cut off with an ellipsis. CARD_FONT_PATH
+# selects a TrueType font, which needs Persian glyphs (e.g. Vazirmatn or
+# DejaVu Sans) for translated cards; Pillow's default font has none. Persian
+# letters are only joined when Pillow has libraqm, which needs FriBiDi
+# installed (see the workflows); workers log an error at startup otherwise.
+CARD_FONT_PATH = os.getenv("CARD_FONT_PATH")
+MIN_FONT_SIZE = 22
+MAX_FONT_SIZE = 40
+TITLE_FONT_SIZE = 50
+MIN_TITLE_FONT_SIZE = 34
+TITLE_MAX_LINES = 3
+LINE_SPACING = 1.17  # Line height as a multiple of the font size
+TITLE_LINE_SPACING = 1.3
+TITLE_GAP = 40  # Between the title and the text
+TITLE_COLOR = (255, 255, 0, 255)  # Yellow for title
+CONTENT_COLOR = (173, 216, 230, 255)  # Light blue for content
+TRANSLATION_COLOR = (200, 230, 200, 255)  # Light green for translation
+OVERLAY_COLOR = (0, 0, 0, 150)  # Semi-transparent darkening overlay
+PADDING_X = 70
+PADDING_Y_TOP = 80
+PADDING_Y_BOTTOM = 50
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+PERSIAN_SAMPLE = "پژگچ"  # Letters Arabic fonts may lack
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """JPEG encoder settings, trading CPU time for upload size"""
+    quality: int = 90
+    optimize: bool = True
+    progressive: bool = False
+
+# Configurable through the environment, e.g. CARD_JPEG_OPTIMIZE=0 for faster encoding
+DEFAULT_ENCODER_PROFILE = EncoderProfile(
+    quality=int(os.getenv("CARD_JPEG_QUALITY", "90")),
+    optimize=os.getenv("CARD_JPEG_OPTIMIZE", "1") == "1",
+    progressive=os.getenv("CARD_JPEG_PROGRESSIVE", "0") == "1"
+)
+
+def encode_image(image, profile=DEFAULT_ENCODER_PROFILE):
+    """Encode an image to JPEG in memory and return the bytes"""
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=profile.quality,
+               optimize=profile.optimize, progressive=profile.progressive)
+    return buffer.getvalue()
+
+@functools.lru_cache(maxsize=None)
+def get_font(size):
+    """Load the card font once per size"""
+    from PIL import ImageFont
+    if CARD_FONT_PATH:
+        return ImageFont.truetype(CARD_FONT_PATH, size)
+    return ImageFont.load_default(size=size)
+
+def has_glyphs(font, text):
+    """True if font draws every character of text as something other than its missing-glyph box"""
+    missing = bytes(font.getmask("\U0010FFFD"))
+    return all(bytes(font.getmask(char)) != missing for char in text)
+
+@functools.lru_cache(maxsize=None)
+def check_rtl_support():
+    """
+    True if translated cards come out readable: Pillow can shape Persian
+    (libraqm) and the card font has Persian glyphs. Logs what is missing.
+    """
+    supported = True
+    if not text_layout.raqm_available():
+        logger.error("Pillow has no libraqm (install FriBiDi): Persian letters on translated cards will not be joined")
+        supported = False
+    if not has_glyphs(get_font(MIN_FONT_SIZE), PERSIAN_SAMPLE):
+        logger.error(f"Card font {CARD_FONT_PATH or '(Pillow default)'} has no Persian glyphs; set CARD_FONT_PATH")
+        supported = False
+    return supported
+
+@functools.lru_cache(maxsize=None)
+def get_advances(size):
+    """Glyph advance table of the card font at a size, kept for the life of the worker"""
+    return text_layout.GlyphAdvances(get_font(size))
+
+@functools.lru_cache(maxsize=256)
+def fit_title(title, width, height):
+    """Title layout, cached: the cards of a batch often share their title"""
+    return text_layout.fit(title, get_advances, width, height,
+                           MIN_TITLE_FONT_SIZE, TITLE_FONT_SIZE, TITLE_LINE_SPACING, TITLE_MAX_LINES)
+
+def prepare_template(background_image_path):
+    """Decode a background and bake the darkening overlay into it"""
+    from PIL import Image
+    base_image = Image.open(background_image_path).convert("RGBA")
+    overlay = Image.new('RGBA', base_image.size, OVERLAY_COLOR)
+    return Image.alpha_composite(base_image, overlay).convert('RGB')
+
+def list_backgrounds(backgrounds_dir):
+    """Paths of the background images in a directory"""
+    return [os.path.join(backgrounds_dir, name) for name in sorted(os.listdir(backgrounds_dir))
+            if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+class CardRenderer:
+    """
+    Renders post cards. Every background in the directory is decoded and
+    darkened once; each card only draws text onto a copy of its template.
+    """
+
+    def __init__(self, backgrounds_dir):
+        self.backgrounds_dir = backgrounds_dir
+        self.templates = {}
+        for path in list_backgrounds(backgrounds_dir):
+            try:
+                self.templates[path] = prepare_template(path)
+            except Exception as e:
+                logger.error(f"Error loading background image {path}: {e}")
+        logger.info(f"Loaded {len(self.templates)} background templates from {backgrounds_dir}")
+        check_rtl_support()
+
+    @property
+    def background_paths(self):
+        return list(self.templates)
+
+    def template(self, background_image_path):
+        """Prepared template for a background, loading unknown paths on demand"""
+        if background_image_path not in self.templates:
+            self.templates[background_image_path] = prepare_template(background_image_path)
+        return self.templates[background_image_path]
+
+    def render(self, text_content, background_image_path, title, is_translation=False):
+        """Draw the title and text onto a copy of the template and return the RGB image"""
+        from PIL import ImageDraw
+        base_image = self.template(background_image_path).copy()
+        draw = ImageDraw.Draw(base_image)
+
+        img_width, img_height = base_image.size
+        content_color = TRANSLATION_COLOR if is_translation else CONTENT_COLOR
+        text_area_width = img_width - (2 * PADDING_X)
+        text_area_height = img_height - PADDING_Y_TOP - PADDING_Y_BOTTOM
+
+        # --- Draw the title ---
+        title_block = fit_title(title, text_area_width, text_area_height // 2)
+        y_cursor = text_layout.draw_block(draw, title_block, get_font(title_block.size), PADDING_X, PADDING_Y_TOP,
+                                          text_area_width, TITLE_COLOR, align="center")
+        y_cursor += TITLE_GAP
+
+        # --- Draw the main text content ---
+        block = text_layout.fit(text_content, get_advances, text_area_width, img_height - y_cursor - PADDING_Y_BOTTOM,
+                                MIN_FONT_SIZE, MAX_FONT_SIZE, LINE_SPACING)
+        text_layout.draw_block(draw, block, get_font(block.size), PADDING_X, y_cursor, text_area_width, content_color)
+
+        return base_image
+
+    def render_jpeg(self, text_content, background_image_path, title, is_translation=False,
+                    profile=DEFAULT_ENCODER_PROFILE):
+        """Render a card and return it encoded as JPEG bytes"""
+        return encode_image(self.render(text_content, background_image_path, title, is_translation), profile)
+
+_renderers = {}
+_renderers_lock = threading.Lock()
+
+def get_renderer(backgrounds_dir):
+    """
+    Return this process's renderer for a backgrounds directory, preloading
+    the templates on first use. Each worker process keeps its own.
+    """
+    with _renderers_lock:
+        if backgrounds_dir not in _renderers:
+            _renderers[backgrounds_dir] = CardRenderer(backgrounds_dir)
+        return _renderers[backgrounds_dir]
+
+def render_card(backgrounds_dir, text_content, background_image_path, title, is_translation=False,
+                profile=DEFAULT_ENCODER_PROFILE):
+    """Render a card to JPEG bytes; picklable entry point for worker processes"""
+    return get_renderer(backgrounds_dir).render_jpeg(text_content, background_image_path, title, is_translation, profile)
+
+@dataclass(frozen=True)
+class CardJob:
+    """One card to render: text and title on a background"""
+    text_content: str
+    background_image_path: str
+    title: str
+    is_translation: bool = False
+
+@dataclass
+class RenderedCard:
+    """JPEG bytes of a card and the seconds spent drawing and encoding it, or the error"""
+    image_bytes: bytes = None
+    render_seconds: float = 0.0
+    encode_seconds: float = 0.0
+    error: str = None
+
+def render_batch(backgrounds_dir, jobs, profile=DEFAULT_ENCODER_PROFILE):
+    """
+    Render many cards in one worker call, one RenderedCard per job in order.
+    Jobs are drawn grouped by background so each template stays hot; a
+    failing card does not fail the others.
+    """
+    renderer = get_renderer(backgrounds_dir)
+    results = [None] * len(jobs)
+    for index in sorted(range(len(jobs)), key=lambda index: jobs[index].background_image_path):
+        job = jobs[index]
+        try:
+            start = time.perf_counter()
+            image = renderer.render(job.text_content, job.background_image_path, job.title, job.is_translation)
+            rendered = time.perf_counter()
+            image_bytes = encode_image(image, profile)
+            results[index] = RenderedCard(image_bytes, rendered - start, time.perf_counter() - rendered)
+        except Exception as e:
+            results[index] = RenderedCard(error=f"{type(e).__name__}: {e}")
+    return results
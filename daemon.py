@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import random
+import signal
+import sys
+
+logger = logging.getLogger(__name__)
+
+# --- Daemon Settings ---
+# By default every script checks once and exits, scheduled by cron / GitHub
+# Actions. With --daemon (or RUN_MODE=daemon) it keeps running and polls every
+# POLL_INTERVAL seconds instead, so the HTTP pool, the caches, the bot and the
+# CPU workers with their loaded templates stay warm between cycles.
+RUN_MODE = os.getenv("RUN_MODE", "once")
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "60"))
+POLL_JITTER = float(os.getenv("POLL_JITTER", "0.1"))  # Fraction of the interval, so instances drift apart
+
+def enabled(argv=None):
+    """True if the script should run as a long-lived service"""
+    argv = sys.argv[1:] if argv is None else argv
+    return "--daemon" in argv or RUN_MODE == "daemon"
+
+def next_delay(interval=None, jitter=None):
+    interval = POLL_INTERVAL if interval is None else interval
+    jitter = POLL_JITTER if jitter is None else jitter
+    return max(0.0, interval * (1 + random.uniform(-jitter, jitter)))
+
+async def run_forever(cycle, interval=None, jitter=None):
+    """
+    Await cycle() every interval seconds (with jitter) until SIGTERM or
+    SIGINT. A cycle in progress is allowed to finish; a second signal cancels
+    it. Errors in a cycle are logged and the next cycle runs as scheduled.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    current = None
+
+    def request_stop(signum):
+        if stop.is_set() and current is not None and not current.done():
+            logger.warning("Second shutdown signal, cancelling the running cycle")
+            current.cancel()
+            return
+        logger.info(f"Received {signal.Signals(signum).name}, stopping after the current cycle")
+        stop.set()
+
+    installed = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, request_stop, signum)
+            installed.append(signum)
+        except (NotImplementedError, RuntimeError):
+            # Not supported on this platform / loop; Ctrl+C still raises KeyboardInterrupt
+            pass
+
+    cycles = 0
+    try:
+        while not stop.is_set():
+            cycles += 1
+            current = asyncio.create_task(cycle())
+            try:
+                await current
+            except asyncio.CancelledError:
+                if not stop.is_set():
+                    raise
+                logger.warning(f"Cycle {cycles} was cancelled during shutdown")
+            except Exception as e:
+                logger.error(f"Cycle {cycles} failed: {e}")
+            current = None
+
+            delay = next_delay(interval, jitter)
+            logger.info(f"Cycle {cycles} done, next check in {delay:.0f}s")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for signum in installed:
+            loop.remove_signal_handler(signum)
+    logger.info(f"Stopped after {cycles} cycles")
@@ -0,0 +1,405 @@
+from datetime import datetime
+import functools
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Parsing helpers for dev.to pages. They take raw HTML and return plain,
+# picklable records so they can run in a worker process.
+#
+# Several parser backends are supported, picked with EXTRACT_BACKEND:
+#   selectolax - lexbor with CSS selectors (fastest)
+#   lxml       - libxml2 with XPath
+#   bs4        - BeautifulSoup with html.parser (always available)
+#   auto       - the fastest one that is installed
+# All backends return the same records. Parsing starts at the first card (or
+# the article body) so the page head, navigation and inline scripts before it
+# are never turned into a tree.
+
+EXTRACT_BACKEND = os.getenv("EXTRACT_BACKEND", "auto")
+DEVTO_BASE_URL = os.getenv("DEVTO_BASE_URL", "https://dev.to")
+# Blocks a post body is split into; also the translation chunk boundaries
+TEXT_BLOCK_TAGS = ['p', 'h1', 'h2', 'h3', 'li']
+# Elements whose text is never part of the article text
+NON_TEXT_TAGS = ['script', 'style', 'template']
+
+LISTING_MARKER = 'crayons-story'
+# Number at the start of a listing card's counter ("33 reactions", "5 min read")
+COUNT_PATTERN = re.compile(r'\d[\d,]*')
+ARTICLE_MARKER = 'crayons-article__main'
+# Post pages are downloaded only up to the end of the article body, and never
+# more than this; the comment thread and footer after it are not needed
+ARTICLE_MAX_BYTES = int(os.getenv("ARTICLE_MAX_BYTES", str(2 * 1024 * 1024)))
+
+def _to_text(html):
+    if isinstance(html, (bytes, bytearray, memoryview)):
+        return bytes(html).decode('utf-8', errors='replace')
+    return html
+
+def _slice_from(html, marker):
+    """Cut the document down to start at the first tag carrying the marker"""
+    index = html.find(marker)
+    while index != -1:
+        start = html.rfind('<', 0, index)
+        # Only a match inside a start tag counts, not one in text or CSS
+        if start != -1 and html[start + 1:start + 2].isalpha() and '>' not in html[start:index]:
+            return html[start:]
+        index = html.find(marker, index + len(marker))
+    return html
+
+# What the article scan looks at: comments and raw-text elements, whose
+# contents are skipped whole, and div tags, whose nesting is followed
+SCAN_TOKEN = re.compile(rb'<!--|<(/?)(div|script|style|textarea|title)\b', re.IGNORECASE)
+COMMENT_END = b'-->'
+# The rest of a start or end tag, allowing '>' inside quoted attribute values
+TAG_END = re.compile(rb"""(?:"[^"]*"|'[^']*'|[^'">])*>""")
+RAW_TEXT_END = {
+    tag: re.compile(rb'</' + tag + rb'\s*>', re.IGNORECASE)
+    for tag in (b'script', b'style', b'textarea', b'title')
+}
+
+class ArticleScanner:
+    """
+    Receives a post page chunk by chunk while it downloads and tells when the
+    article body (the div carrying ARTICLE_MARKER) has been closed, by
+    following the div nesting from its start tag, or when max_bytes have
+    arrived. Comments and the contents of script, style, textarea and title
+    elements are skipped, so a "</div>" inside them does not count.
+    content() is the article body if it was found, else the page.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or ARTICLE_MAX_BYTES
+        self.data = bytearray()
+        self.start = None  # Offset of the article's start tag
+        self.end = None  # Offset just past its closing tag
+        self.searched = 0  # Marker search resumes here
+        self.scanned = 0  # Div scan resumes here
+        self.depth = 0
+        self.truncated = False
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def _find_start(self):
+        marker = ARTICLE_MARKER.encode()
+        index = self.data.find(marker, self.searched)
+        while index != -1:
+            start = self.data.rfind(b'<', 0, index)
+            # Only a match inside a start tag counts, not one in text or CSS
+            if start != -1 and self.data[start + 1:start + 2].isalpha() and b'>' not in self.data[start:index]:
+                return start
+            index = self.data.find(marker, index + len(marker))
+        self.searched = max(0, len(self.data) - len(marker))
+        return None
+
+    def _scan(self):
+        """Follow the div nesting as far as complete tags have arrived; True once the article is closed"""
+        while (match := SCAN_TOKEN.search(self.data, self.scanned)) is not None:
+            if match.group(0) == b'<!--':
+                close = self.data.find(COMMENT_END, match.end())
+                if close == -1:
+                    return False  # The rest of the comment has not arrived yet
+                self.scanned = close + len(COMMENT_END)
+                continue
+            tag_end = TAG_END.match(self.data, match.end())
+            if tag_end is None:
+                return False  # The rest of the tag has not arrived yet
+            closing, name = match.group(1), match.group(2).lower()
+            if name != b'div':
+                if not closing:
+                    raw_end = RAW_TEXT_END[name].search(self.data, tag_end.end())
+                    if raw_end is None:
+                        return False
+                    self.scanned = raw_end.end()
+                else:
+                    self.scanned = tag_end.end()
+                continue
+            self.scanned = tag_end.end()
+            self.depth += -1 if closing else 1
+            if self.depth == 0:
+                self.end = self.scanned
+                return True
+        return False
+
+    def feed(self, chunk):
+        """Add a chunk; True once nothing more needs to be downloaded"""
+        self.data += chunk
+        if self.start is None:
+            self.start = self._find_start()
+            self.scanned = self.start or 0
+        if self.start is not None and self._scan():
+            return True
+        if len(self.data) >= self.max_bytes:
+            self.truncated = True
+            return True
+        return False
+
+    def content(self):
+        if self.start is None:
+            return bytes(self.data)
+        return bytes(self.data[self.start:self.end])
+
+def _block_text(text):
+    """Text of a paragraph block on one line; inline elements keep the spaces around them"""
+    return " ".join(text.split())
+
+def _absolute_url(href):
+    return f"{DEVTO_BASE_URL}{href}" if not href.startswith('http') else href
+
+def _count(text):
+    match = COUNT_PATTERN.search(text or '')
+    return int(match.group().replace(',', '')) if match else 0
+
+def _listing_record(title, href, datetime_value, reactions=None, comments=None, tags=(), reading_time=None):
+    """
+    A listing card's record. The counters are the texts shown on the card,
+    0 when the card has none; tags drop their leading '#'.
+    """
+    # fromisoformat only accepts a trailing Z from Python 3.11 on
+    published_at = datetime.fromisoformat(datetime_value.replace("Z", "+00:00"))
+    return {
+        "title": title,
+        "url": _absolute_url(href),
+        "published_at": published_at,
+        "reactions": _count(reactions),
+        "comments_count": _count(comments),
+        "tags": [tag.strip().lstrip('#') for tag in tags if tag.strip()],
+        "reading_time_minutes": _count(reading_time),
+    }
+
+# --- BeautifulSoup backend ---
+
+def _parse_listing_bs4(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+
+    articles = []
+    for article in soup.find_all('div', class_='crayons-story'):
+        try:
+            title_tag = article.find('h2', class_='crayons-story__title')
+            if not title_tag:
+                continue
+
+            link_tag = title_tag.find('a')
+            if not link_tag:
+                continue
+
+            time_tag = article.find('time')
+            if not time_tag or 'datetime' not in time_tag.attrs:
+                continue
+
+            reactions = article.find(class_='aggregate_reactions_counter')
+            comments = article.find('a', href=lambda href: href and href.endswith('#comments'))
+            tags = article.find('div', class_='crayons-story__tags')
+            save = article.find('div', class_='crayons-story__save')
+            reading_time = save.find('small') if save else None
+
+            articles.append(_listing_record(
+                link_tag.get_text(strip=True), link_tag['href'], time_tag['datetime'],
+                reactions.get_text(strip=True) if reactions else None,
+                comments.get_text(strip=True) if comments else None,
+                [tag.get_text(strip=True) for tag in tags.find_all('a')] if tags else (),
+                reading_time.get_text(strip=True) if reading_time else None,
+            ))
+
+        except Exception as e:
+            logger.error(f"Error processing article: {e}")
+            continue
+
+    return articles
+
+def _parse_article_bs4(html, blocks):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Get main content
+    main_content = soup.find('div', class_=ARTICLE_MARKER)
+    if not main_content:
+        return None, None
+
+    if blocks:
+        text_content_parts = [_block_text(tag.get_text()) for tag in main_content.find_all(TEXT_BLOCK_TAGS)]
+        text_content = "\n\n".join(part for part in text_content_parts if part)
+    else:
+        text_content = main_content.get_text(separator='\n', strip=True)
+
+    # Extract images (first image only for simplicity)
+    image = main_content.find('img')
+    image_url = image['src'] if image else None
+
+    return text_content, image_url
+
+# --- selectolax backend ---
+
+def _selectolax_text(node, separator=''):
+    """Same result as bs4's get_text(separator, strip=True)"""
+    parts = (child.text_content.strip() for child in node.traverse(include_text=True) if child.tag == '-text')
+    return separator.join(part for part in parts if part)
+
+def _parse_listing_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html)
+
+    articles = []
+    for article in tree.css('div.crayons-story'):
+        try:
+            link_tag = article.css_first('h2.crayons-story__title a')
+            if link_tag is None:
+                continue
+
+            time_tag = article.css_first('time')
+            if time_tag is None or 'datetime' not in time_tag.attributes:
+                continue
+
+            reactions = article.css_first('.aggregate_reactions_counter')
+            comments = article.css_first('a[href$="#comments"]')
+            reading_time = article.css_first('div.crayons-story__save small')
+
+            articles.append(_listing_record(
+                _selectolax_text(link_tag), link_tag.attributes['href'], time_tag.attributes['datetime'],
+                _selectolax_text(reactions) if reactions is not None else None,
+                _selectolax_text(comments) if comments is not None else None,
+                [_selectolax_text(tag) for tag in article.css('div.crayons-story__tags a')],
+                _selectolax_text(reading_time) if reading_time is not None else None,
+            ))
+
+        except Exception as e:
+            logger.error(f"Error processing article: {e}")
+            continue
+
+    return articles
+
+def _parse_article_selectolax(html, blocks):
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html)
+
+    main_content = tree.css_first(f'div.{ARTICLE_MARKER}')
+    if main_content is None:
+        return None, None
+    main_content.strip_tags(NON_TEXT_TAGS)
+
+    if blocks:
+        text_content_parts = [_block_text(tag.text(deep=True)) for tag in main_content.css(', '.join(TEXT_BLOCK_TAGS))]
+        text_content = "\n\n".join(part for part in text_content_parts if part)
+    else:
+        text_content = _selectolax_text(main_content, '\n')
+
+    image = main_content.css_first('img')
+    image_url = image.attributes.get('src') if image is not None else None
+
+    return text_content, image_url
+
+# --- lxml backend ---
+
+def _class_xpath(tag, class_name):
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+def _lxml_text(node, separator=''):
+    """Same result as bs4's get_text(separator, strip=True)"""
+    parts = (part.strip() for part in node.itertext())
+    return separator.join(part for part in parts if part)
+
+def _parse_listing_lxml(html):
+    import lxml.html
+    tree = lxml.html.document_fromstring(html)
+
+    articles = []
+    for article in tree.xpath(f"//{_class_xpath('div', 'crayons-story')}"):
+        try:
+            links = article.xpath(f".//{_class_xpath('h2', 'crayons-story__title')}//a")
+            if not links:
+                continue
+
+            times = article.xpath(".//time")
+            if not times or 'datetime' not in times[0].attrib:
+                continue
+
+            reactions = article.xpath(f".//{_class_xpath('*', 'aggregate_reactions_counter')}")
+            comments = article.xpath(".//a[substring(@href, string-length(@href) - 8) = '#comments']")
+            reading_time = article.xpath(f".//{_class_xpath('div', 'crayons-story__save')}//small")
+
+            articles.append(_listing_record(
+                _lxml_text(links[0]), links[0].get('href'), times[0].get('datetime'),
+                _lxml_text(reactions[0]) if reactions else None,
+                _lxml_text(comments[0]) if comments else None,
+                [_lxml_text(tag) for tag in article.xpath(f".//{_class_xpath('div', 'crayons-story__tags')}//a")],
+                _lxml_text(reading_time[0]) if reading_time else None,
+            ))
+
+        except Exception as e:
+            logger.error(f"Error processing article: {e}")
+            continue
+
+    return articles
+
+def _parse_article_lxml(html, blocks):
+    import lxml.etree
+    import lxml.html
+    tree = lxml.html.document_fromstring(html)
+
+    found = tree.xpath(f"//{_class_xpath('div', ARTICLE_MARKER)}")
+    if not found:
+        return None, None
+    main_content = found[0]
+    lxml.etree.strip_elements(main_content, *NON_TEXT_TAGS, with_tail=False)
+
+    if blocks:
+        text_content_parts = [_block_text(''.join(tag.itertext())) for tag in main_content.iter(*TEXT_BLOCK_TAGS)]
+        text_content = "\n\n".join(part for part in text_content_parts if part)
+    else:
+        text_content = _lxml_text(main_content, '\n')
+
+    images = main_content.xpath(".//img")
+    image_url = images[0].get('src') if images else None
+
+    return text_content, image_url
+
+BACKENDS = {
+    "selectolax": (_parse_listing_selectolax, _parse_article_selectolax),
+    "lxml": (_parse_listing_lxml, _parse_article_lxml),
+    "bs4": (_parse_listing_bs4, _parse_article_bs4),
+}
+BACKEND_MODULES = {"selectolax": "selectolax.lexbor", "lxml": "lxml.html", "bs4": "bs4"}
+
+def backend_available(name):
+    try:
+        __import__(BACKEND_MODULES[name])
+        return True
+    except ImportError:
+        return False
+
+@functools.lru_cache(maxsize=None)
+def resolve_backend(name=None):
+    """Name of the backend to use, falling back to bs4 if the requested one is missing"""
+    name = name or EXTRACT_BACKEND
+    if name == "auto":
+        return next(backend for backend in BACKENDS if backend_available(backend))
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown extract backend: {name}")
+    if not backend_available(name):
+        logger.warning(f"Extract backend {name} is not installed, falling back to bs4")
+        return "bs4"
+    return name
+
+def parse_listing(html, backend=None):
+    """
+    Parse a dev.to listing page into article records (dicts with title,
+    url, published_at, reactions, comments_count, tags and
+    reading_time_minutes), in listing order.
+    """
+    parse, _ = BACKENDS[resolve_backend(backend)]
+    return parse(_slice_from(_to_text(html), LISTING_MARKER))
+
+def parse_article(html, blocks=False, backend=None):
+    """
+    Extract the text content and first image URL from a post page.
+    With blocks=True the text is made of the paragraph, heading and list item
+    blocks separated by blank lines; otherwise it is all text, one line per node.
+    Returns (None, None) if the page has no article body.
+    """
+    _, parse = BACKENDS[resolve_backend(backend)]
+    return parse(_slice_from(_to_text(html), ARTICLE_MARKER), blocks)
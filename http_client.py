@@ -0,0 +1,123 @@
+import httpx
+import asyncio
+import logging
+import os
+from urllib.parse import urlsplit
+
+import resilience
+
+logger = logging.getLogger(__name__)
+
+# --- HTTP Settings ---
+# A single keep-alive connection pool is shared by every fetch, translation and
+# image download, so repeated requests to dev.to, pollinations and the image
+# CDN reuse connections instead of paying a TCP/TLS handshake each time.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "6"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# Only these are retried by default; a repeated POST could post a message twice
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+_client = None
+_host_limits = {}
+
+def http2_available():
+    """HTTP/2 is only used when the optional h2 package is installed"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def get_client():
+    """Return the shared AsyncClient, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        use_http2 = http2_available()
+        _client = httpx.AsyncClient(
+            http2=use_http2,
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            follow_redirects=True
+        )
+        logger.info(f"Created shared HTTP client (http2={use_http2})")
+    return _client
+
+def host_limit(url):
+    """Semaphore capping concurrent requests to the host of the given URL"""
+    host = urlsplit(url).netloc
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST)
+    return _host_limits[host]
+
+async def request(method, url, timeout=None, retries=None, **kwargs):
+    """
+    Send a request through the shared pool and return the httpx.Response.
+    A per-request timeout (seconds) overrides the default read timeout; both
+    are capped by the current deadline (see resilience.deadline). Transient
+    failures are retried up to retries attempts, by default only for
+    idempotent methods, behind the host's circuit breaker.
+    """
+    if retries is None:
+        retries = resilience.RETRY_ATTEMPTS if method in IDEMPOTENT_METHODS else 1
+
+    async def send():
+        read_timeout = resilience.timeout_for(HTTP_READ_TIMEOUT if timeout is None else timeout)
+        kwargs["timeout"] = httpx.Timeout(read_timeout, connect=min(HTTP_CONNECT_TIMEOUT, read_timeout))
+        async with host_limit(url):
+            return await get_client().request(method, url, **kwargs)
+
+    return await resilience.call(urlsplit(url).netloc, send, attempts=retries)
+
+async def stream_get(url, consumer_factory, timeout=None, retries=None, **kwargs):
+    """
+    GET url and feed the body, as it arrives, to a consumer made by
+    consumer_factory(response) for each attempt. Downloading stops as soon as
+    consumer.feed(chunk) returns True; the rest of the body is never read.
+    Returns the consumer; raises httpx.HTTPStatusError for error statuses.
+    """
+    if retries is None:
+        retries = resilience.RETRY_ATTEMPTS
+    consumer = None
+
+    async def send():
+        nonlocal consumer
+        read_timeout = resilience.timeout_for(HTTP_READ_TIMEOUT if timeout is None else timeout)
+        kwargs["timeout"] = httpx.Timeout(read_timeout, connect=min(HTTP_CONNECT_TIMEOUT, read_timeout))
+        async with host_limit(url):
+            async with get_client().stream("GET", url, **kwargs) as response:
+                if not response.is_error:
+                    consumer = consumer_factory(response)
+                    async for chunk in response.aiter_bytes():
+                        if consumer.feed(chunk):
+                            break
+                return response
+
+    response = await resilience.call(urlsplit(url).netloc, send, attempts=retries)
+    response.raise_for_status()
+    return consumer
+
+async def get(url, **kwargs):
+    return await request("GET", url, **kwargs)
+
+async def post(url, **kwargs):
+    return await request("POST", url, **kwargs)
+
+async def aclose():
+    """Close the shared client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_limits.clear()
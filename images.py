@@ -0,0 +1,92 @@
+import io
+import logging
+import os
+
+from card_renderer import encode_image
+
+logger = logging.getLogger(__name__)
+
+# --- Photo Download Settings ---
+# Post images are streamed with checks on the headers and the first bytes:
+# anything that is not a photo Telegram accepts, or is larger than
+# PHOTO_MAX_BYTES, is abandoned without downloading the rest. Telegram
+# recompresses photos to at most 2560 pixels per side anyway, so larger ones
+# are scaled down before uploading.
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(10 * 1024 * 1024)))  # Bot API photo upload limit
+PHOTO_MAX_SIDE = int(os.getenv("PHOTO_MAX_SIDE", "2560"))
+
+# Leading bytes of the formats Telegram accepts as photos
+PHOTO_SIGNATURES = {
+    b'\xff\xd8\xff': "jpeg",
+    b'\x89PNG\r\n\x1a\n': "png",
+    b'GIF87a': "gif",
+    b'GIF89a': "gif",
+}
+
+def sniff_format(head):
+    """Photo format from the first bytes, or None"""
+    for signature, name in PHOTO_SIGNATURES.items():
+        if head.startswith(signature):
+            return name
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return "webp"
+    return None
+
+class PhotoDownload:
+    """
+    Stream consumer for http_client.stream_get collecting a photo. It stops
+    as soon as the headers or the first bytes show the download is not a
+    usable photo; rejected then says why.
+    """
+
+    def __init__(self, response, max_bytes=None):
+        self.max_bytes = max_bytes or PHOTO_MAX_BYTES
+        self.data = bytearray()
+        self.format = None
+        self.rejected = None
+        content_type = response.headers.get("Content-Type", "")
+        content_length = response.headers.get("Content-Length")
+        if content_type and not content_type.startswith(("image/", "application/octet-stream")):
+            self.rejected = f"content type {content_type}"
+        elif content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            self.rejected = f"{content_length} bytes"
+
+    def feed(self, chunk):
+        """Add a chunk; True once nothing more needs to be downloaded"""
+        if self.rejected:
+            return True
+        self.data += chunk
+        if self.format is None and len(self.data) >= 12:
+            self.format = sniff_format(bytes(self.data[:12]))
+            if self.format is None:
+                self.rejected = "unknown image format"
+                return True
+        if len(self.data) > self.max_bytes:
+            self.rejected = f"more than {self.max_bytes} bytes"
+            return True
+        return False
+
+    def content(self):
+        """The photo bytes, or None if it was rejected"""
+        if self.rejected or self.format is None:
+            return None
+        return bytes(self.data)
+
+def fit_photo(content, max_side=None):
+    """
+    Scale a photo down to at most max_side pixels per side, re-encoded as
+    JPEG; photos that already fit are returned unchanged. JPEGs are decoded
+    at a reduced scale right away (Image.draft), so large ones are cheap.
+    """
+    from PIL import Image
+
+    max_side = max_side or PHOTO_MAX_SIDE
+    image = Image.open(io.BytesIO(content))
+    if max(image.size) <= max_side:
+        return content
+    original_size = image.size
+    image.draft("RGB", (max_side, max_side))
+    image = image.convert("RGB")
+    image.thumbnail((max_side, max_side))
+    logger.info(f"Scaled photo down from {original_size} to {image.size}")
+    return encode_image(image)
@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+import json
+import logging
+
+from seen_index import PENDING_STATES
+
+logger = logging.getLogger(__name__)
+
+# --- Job Queue ---
+# Every claimed post is a job stored next to the seen-index, together with
+# the stages it has completed and their results (fetched text, translation,
+# summary, sent message ids, ...). A failed or interrupted post is resumed by
+# a later run from its last completed stage, even once it has dropped out of
+# the listing, so expensive translations are not redone and messages that
+# already went out are not sent twice. Binary results (images) are not
+# stored; the stages producing them simply run again.
+
+def _json_data(data):
+    return {name: value for name, value in data.items() if not isinstance(value, (bytes, bytearray))}
+
+class JobQueue:
+    """Per-post progress of a pipeline, in the seen-index database"""
+
+    def __init__(self, seen):
+        self.seen = seen
+        self.conn = seen.conn
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                post TEXT NOT NULL,
+                done TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (scope, key)
+            )
+        """)
+
+    def _store(self, post):
+        record = {
+            "title": post.title,
+            "url": post.url,
+            "published_at": post.published_at.isoformat(),
+            "data": _json_data(post.data),
+        }
+        self.conn.execute(
+            """INSERT INTO jobs (scope, key, post, done, updated_at) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (scope, key) DO UPDATE SET post = excluded.post, done = excluded.done,
+               updated_at = excluded.updated_at""",
+            (self.seen.scope, post.key, json.dumps(record, ensure_ascii=False), json.dumps(sorted(post.done)),
+             datetime.now(timezone.utc).isoformat())
+        )
+
+    def start(self, post):
+        """
+        Track a claimed post. If an earlier attempt left progress behind,
+        the post continues from it.
+        """
+        row = self.conn.execute(
+            "SELECT post, done FROM jobs WHERE scope = ? AND key = ?", (self.seen.scope, post.key)
+        ).fetchone()
+        if row is not None:
+            record, done = json.loads(row[0]), json.loads(row[1])
+            post.data.update(record["data"])
+            post.done.update(done)
+            if done:
+                logger.info(f"Resuming '{post.title}' after {', '.join(done)}")
+        else:
+            self.checkpoint(post)
+        post.on_complete = self.checkpoint
+
+    def checkpoint(self, post):
+        """Store the post's progress after a completed stage"""
+        try:
+            self._store(post)
+        except (TypeError, ValueError) as e:
+            # Results that are not JSON are simply not kept; their stage reruns
+            logger.warning(f"Could not store progress of '{post.title}': {e}")
+
+    def finish(self, post):
+        """Forget a post that was sent or given up on"""
+        self.conn.execute("DELETE FROM jobs WHERE scope = ? AND key = ?", (self.seen.scope, post.key))
+
+    def pending(self):
+        """
+        Posts of earlier runs that failed, were interrupted or were deferred,
+        oldest first, as records with key, title, url and published_at
+        """
+        rows = self.conn.execute(
+            """SELECT jobs.key, jobs.post FROM jobs JOIN articles
+               ON articles.scope = jobs.scope AND articles.key = jobs.key
+               WHERE jobs.scope = ? AND articles.state IN (?, ?, ?)
+               ORDER BY articles.published_at""",
+            (self.seen.scope, *PENDING_STATES)
+        )
+        records = []
+        for key, post in rows:
+            record = json.loads(post)
+            records.append({"key": key, "title": record["title"], "url": record["url"],
+                            "published_at": datetime.fromisoformat(record["published_at"])})
+        return records
+
+    def prune(self):
+        """Drop jobs of posts that are no longer pending, e.g. after being given up on"""
+        self.conn.execute(
+            """DELETE FROM jobs WHERE scope = ? AND NOT EXISTS (
+                   SELECT 1 FROM articles WHERE articles.scope = jobs.scope AND articles.key = jobs.key
+                   AND articles.state IN (?, ?, ?))""",
+            (self.seen.scope, *PENDING_STATES)
+        )
@@ -0,0 +1,180 @@
+from contextlib import contextmanager
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# --- Metrics Settings ---
+# Every stage (listing fetch, article fetch, parse, translate, render, encode,
+# send, ...) records its duration, payload sizes, errors and retries here.
+# After each run the totals are logged and, if METRICS_PATH is set, written
+# there as Prometheus text (e.g. for node_exporter's textfile collector) or
+# as a JSON summary. In daemon mode the totals keep accumulating.
+METRICS_PATH = os.getenv("METRICS_PATH")
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "prometheus")  # prometheus or json
+METRICS_PREFIX = "devto_bot"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = tuple(1024 * 4 ** power for power in range(8))  # 1 KiB to 16 MiB
+
+class Histogram:
+    """Cumulative-bucket histogram as in Prometheus, plus the maximum"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, at most the maximum"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+class Registry:
+    """Histograms and counters keyed by metric name and label values"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.labels = {}  # Added to every series, e.g. the flow
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(sorted(dict(self.labels, **labels).items()))
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, self._key(labels))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, self._key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def prometheus_text(self):
+        def series(name, labels, extra=()):
+            pairs = ",".join(f'{label}="{value}"' for label, value in tuple(labels) + tuple(extra))
+            return f"{METRICS_PREFIX}_{name}{{{pairs}}}" if pairs else f"{METRICS_PREFIX}_{name}"
+
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {METRICS_PREFIX}_{name} histogram")
+                for (metric, labels), histogram in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{series(name + '_bucket', labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{series(name + '_sum', labels)} {histogram.sum}")
+                    lines.append(f"{series(name + '_count', labels)} {histogram.count}")
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {METRICS_PREFIX}_{name} counter")
+                for (metric, labels), value in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(f"{series(name, labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Nested dict: metric -> label string -> stats (JSON friendly)"""
+        result = {}
+        with self.lock:
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                result.setdefault(name, {})[",".join(f"{k}={v}" for k, v in labels)] = {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "mean": histogram.sum / histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                    "max": histogram.max,
+                }
+            for (name, labels), value in sorted(self.counters.items()):
+                result.setdefault(name, {})[",".join(f"{k}={v}" for k, v in labels)] = value
+        return result
+
+registry = Registry()
+
+def set_flow(flow):
+    """Label every series with the script it comes from"""
+    registry.labels["flow"] = flow
+
+def observe_duration(stage, seconds):
+    registry.observe("stage_duration_seconds", seconds, stage=stage)
+
+def record_size(stage, size):
+    """Payload size in bytes handled by a stage (downloaded page, rendered JPEG, upload, ...)"""
+    registry.observe("stage_payload_bytes", size, SIZE_BUCKETS, stage=stage)
+
+def record_error(stage):
+    registry.increment("stage_errors_total", stage=stage)
+
+def record_retry(stage):
+    registry.increment("stage_retries_total", stage=stage)
+
+def record_circuit_open(host):
+    registry.increment("circuit_open_total", host=host)
+
+def record_hedge(stage):
+    """A second request sent because the first was slower than usual"""
+    registry.increment("hedged_requests_total", stage=stage)
+
+def record_post(result):
+    """A post that was sent or failed"""
+    registry.increment("posts_total", result=result)
+
+@contextmanager
+def timer(stage):
+    """Time the enclosed block as stage; an exception escaping it counts as an error"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        record_error(stage)
+        raise
+    finally:
+        observe_duration(stage, time.perf_counter() - start)
+
+def log_summary():
+    """One log line with the count, p50 and max of every stage"""
+    stages = registry.summary().get("stage_duration_seconds", {})
+    if stages:
+        logger.info("Stage timings: " + ", ".join(
+            f"{labels.rpartition('stage=')[2]} {stats['count']}x p50 {stats['p50'] * 1000:.0f}ms "
+            f"max {stats['max'] * 1000:.0f}ms"
+            for labels, stats in stages.items()
+        ))
+
+def export(path=None, fmt=None):
+    """Write all metrics to path (METRICS_PATH by default), replacing the file atomically"""
+    path = path or METRICS_PATH
+    if not path:
+        return
+    fmt = fmt or METRICS_FORMAT
+    try:
+        content = json.dumps(registry.summary(), indent=2) if fmt == "json" else registry.prometheus_text()
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temporary_path, path)
+    except OSError as e:
+        logger.error(f"Could not write metrics to {path}: {e}")
@@ -0,0 +1,61 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger(__name__)
+
+# --- CPU Offload Settings ---
+# Pillow rendering and HTML parsing are CPU-bound and would stall the event
+# loop. They are run according to EXECUTION_MODE:
+#   process - in a process pool sized to the machine (scales across cores)
+#   thread  - in the default thread pool (keeps the loop responsive)
+#   inline  - directly on the event loop (simplest, for debugging)
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 1)))
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "process" if CPU_WORKERS > 1 else "thread")
+
+_executor = None
+
+def get_executor():
+    """Return the shared process pool, starting it on first use"""
+    global _executor
+    if _executor is None:
+        # forkserver children start from a clean process instead of forking
+        # the event loop's threads and open connections
+        _executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+        )
+        logger.info(f"Started CPU worker pool with {CPU_WORKERS} processes")
+    return _executor
+
+async def run_cpu(fn, *args, **kwargs):
+    """
+    Run a CPU-bound function according to EXECUTION_MODE.
+    In process mode fn must be a module-level function and its arguments and
+    result must be picklable.
+    """
+    if EXECUTION_MODE == "inline":
+        return fn(*args, **kwargs)
+    if EXECUTION_MODE == "thread":
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+async def run_cpu_light(fn, *args, **kwargs):
+    """
+    Run a short CPU-bound function (e.g. parsing a listing) like run_cpu, but
+    in a thread while the process pool has not been started yet, so runs that
+    turn out to have nothing to do never pay for starting it.
+    """
+    if EXECUTION_MODE == "process" and _executor is None:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return await run_cpu(fn, *args, **kwargs)
+
+def shutdown():
+    """Stop the worker processes, if any were started"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,315 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+import asyncio
+import logging
+import os
+import time
+
+import httpx
+
+import daemon
+import http_client
+import metrics
+import offload
+import resilience
+from job_queue import JobQueue
+from scheduling import Scheduler
+from seen_index import SeenIndex
+
+logger = logging.getLogger(__name__)
+
+# --- Pipeline Settings ---
+# Every script is a Pipeline: a source listing candidate posts, steps of
+# transforms that prepare each post, and a sink that publishes it. Up to
+# PIPELINE_DEPTH posts are prepared concurrently, each stage bounded by its
+# own limit, while publishing happens strictly in the order the scheduler
+# chose (see scheduling).
+PIPELINE_DEPTH = int(os.getenv("PIPELINE_DEPTH", "6"))
+# Preparing one post may take at most this long; every request made for it
+# has its timeout capped accordingly (see resilience.deadline)
+PREPARE_DEADLINE = float(os.getenv("PREPARE_DEADLINE", "180"))
+
+@dataclass
+class Post:
+    """
+    A post moving through a pipeline; transforms add their results to data
+    and completed stages to done, which the job queue keeps across runs.
+    """
+    key: str  # Dedup key in the seen-index
+    title: str
+    url: str
+    published_at: datetime
+    data: dict = field(default_factory=dict)
+    done: set = field(default_factory=set)
+    skipped: str = None  # Why a transform decided the post is not to be published
+    on_complete: object = field(default=None, repr=False, compare=False)  # Called with the post
+
+    def complete(self, stage):
+        self.done.add(stage)
+        if self.on_complete is not None:
+            self.on_complete(self)
+
+_limits = {}
+_limits_loop = None
+
+def stage_limit(name, concurrency):
+    """Semaphore shared by all stages with the same name on the running loop"""
+    global _limits_loop
+    loop = asyncio.get_running_loop()
+    if _limits_loop is not loop:
+        _limits.clear()
+        _limits_loop = loop
+    if name not in _limits:
+        _limits[name] = asyncio.Semaphore(concurrency)
+    return _limits[name]
+
+class Source:
+    """Lists candidate posts for a run"""
+    name = "source"
+
+    async def fetch(self, seen):
+        """
+        Posts published since the seen-index threshold, in publishing order;
+        an empty list if nothing changed. Raises on failure.
+        """
+        raise NotImplementedError
+
+    def commit(self, seen, new_posts):
+        """Called once a fetched listing has been fully processed"""
+
+class Transform:
+    """
+    A preparation step. apply() adds its results to post.data and returns
+    False if the post cannot be published; for a post that should not be
+    published at all (e.g. a duplicate) it sets post.skipped instead. A
+    resumable step is skipped for posts that completed it in an earlier run;
+    steps whose results are not kept by the job queue (e.g. images) are not
+    resumable.
+    """
+    name = "transform"
+    concurrency = None  # Concurrent applies across posts, None for unbounded
+    limit_name = None  # Stages sharing a name share the limit; defaults to name
+    resumable = True
+
+    async def __call__(self, post):
+        if self.resumable and self.name in post.done:
+            return True
+        if self.concurrency is None:
+            return await self._timed_apply(post)
+        async with stage_limit(self.limit_name or self.name, self.concurrency):
+            return await self._timed_apply(post)
+
+    async def _timed_apply(self, post):
+        with metrics.timer(self.name):
+            ok = await self.apply(post)
+        if not ok:
+            metrics.record_error(self.name)
+        elif self.resumable:
+            post.complete(self.name)
+        return ok
+
+    async def apply(self, post):
+        raise NotImplementedError
+
+    def sent(self, post):
+        """Called once the post has been published"""
+
+class Sink:
+    """Publishes a prepared post; send() returns True on success"""
+    name = "sink"
+
+    async def send(self, post):
+        raise NotImplementedError
+
+    async def send_once(self, post, stage, send_fn, *args, **kwargs):
+        """
+        Send one of the post's messages unless an earlier attempt already
+        did. The sent message id (a list of them for an album) is kept in
+        post.data[stage].
+        """
+        if stage not in post.done:
+            message = await send_fn(*args, **kwargs)
+            if isinstance(message, list):
+                post.data[stage] = [item.get("message_id") for item in message]
+            else:
+                post.data[stage] = message.get("message_id") if isinstance(message, dict) else None
+            post.complete(stage)
+        return post.data.get(stage)
+
+class Pipeline:
+    """
+    source -> steps -> sink for one script. A step is a transform or a tuple
+    of transforms that run concurrently on the same post. scope names the
+    script's records in the shared seen-index.
+    """
+
+    def __init__(self, scope, source, steps, sink, depth=None, scheduler=None):
+        self.scope = scope
+        self.source = source
+        self.steps = steps
+        self.sink = sink
+        self.depth = depth or PIPELINE_DEPTH
+        self.scheduler = scheduler or Scheduler()
+
+    async def prepare(self, post):
+        """
+        Run the steps on a post within PREPARE_DEADLINE; False if any of them
+        failed. The remaining steps are left out once the post is skipped.
+        """
+        try:
+            with resilience.deadline(PREPARE_DEADLINE):
+                for step in self.steps:
+                    if isinstance(step, tuple):
+                        if not all(await asyncio.gather(*(transform(post) for transform in step))):
+                            return False
+                    elif not await step(post):
+                        return False
+                    if post.skipped:
+                        return True
+            return True
+        except Exception as e:
+            logger.error(f"Error preparing post '{post.title}': {e}")
+            return False
+
+    async def publish(self, post):
+        try:
+            with metrics.timer("send"):
+                return await self.sink.send(post)
+        except Exception as e:
+            logger.error(f"Error sending post '{post.title}' to Telegram: {e}")
+            return False
+
+    def sent(self, post):
+        """Let every transform know the post has been published"""
+        for step in self.steps:
+            for transform in step if isinstance(step, tuple) else (step,):
+                try:
+                    transform.sent(post)
+                except Exception as e:
+                    logger.warning(f"Error in '{transform.name}' after sending post '{post.title}': {e}")
+
+    def defer(self, seen, jobs, post):
+        """Leave a post to the next run, or give up on it once it is too old"""
+        if self.scheduler.expired(post):
+            seen.mark_skipped(post.key)
+            jobs.finish(post)
+            metrics.record_post("skipped")
+            logger.info(f"Skipped post '{post.title}': deferred until it was too old")
+        else:
+            seen.mark_deferred(post.key)
+            metrics.record_post("deferred")
+            logger.info(f"Deferred post '{post.title}' to the next run")
+
+    async def run(self):
+        """Check once for new posts and publish them"""
+        logger.info("Checking for new posts...")
+        metrics.set_flow(self.scope)
+        seen = SeenIndex(self.scope)
+        jobs = JobQueue(seen)
+        try:
+            # Posts that failed, were interrupted or were deferred earlier go
+            # first, even if they are no longer listed
+            pending = [Post(**record) for record in jobs.pending()]
+            with metrics.timer(self.source.name):
+                listed = await self.source.fetch(seen)
+            pending_keys = {post.key for post in pending}
+            listed = [post for post in listed if post.key not in pending_keys]
+            # Only posts that no previous run has handled or is still handling
+            posts = [
+                post for post in pending + listed
+                if not seen.is_handled(post.key) and seen.claim(post.key, post.published_at)
+            ]
+            for post in posts:
+                jobs.start(post)
+            if not posts:
+                logger.info("No new posts found since the last check.")
+                self.source.commit(seen, 0)
+                return
+
+            # Best posts first, within the run's cost budget
+            planned, deferred = self.scheduler.plan(posts, first=pending_keys)
+            for post in deferred:
+                self.defer(seen, jobs, post)
+
+            window = asyncio.Semaphore(self.depth)
+            queue = asyncio.Queue()
+            started = {}
+
+            async def schedule():
+                for index, post in enumerate(planned):
+                    await window.acquire()
+                    if not self.scheduler.has_time():
+                        logger.info("Time budget of the run reached")
+                        for later in planned[index:]:
+                            self.defer(seen, jobs, later)
+                        break
+                    logger.info(f"Found new post: '{post.title}' published at {post.published_at}")
+                    started[post.key] = time.monotonic()
+                    await queue.put((post, asyncio.create_task(self.prepare(post))))
+                await queue.put(None)
+
+            producer = asyncio.create_task(schedule())
+            sent = 0
+            try:
+                while (item := await queue.get()) is not None:
+                    post, task = item
+                    try:
+                        ok = await task
+                        if ok and post.skipped:
+                            seen.mark_skipped(post.key)
+                            jobs.finish(post)
+                            metrics.record_post("skipped")
+                            logger.info(f"Skipped post '{post.title}': {post.skipped}")
+                        elif ok and await self.publish(post):
+                            sent += 1
+                            seen.mark_sent(post.key)
+                            jobs.finish(post)
+                            self.sent(post)
+                            metrics.record_post("sent")
+                            self.scheduler.observe(time.monotonic() - started[post.key])
+                            logger.info(f"Successfully processed and sent post: '{post.title}'")
+                        else:
+                            seen.mark_failed(post.key)
+                            if seen.is_handled(post.key):
+                                jobs.finish(post)
+                            metrics.record_post("failed")
+                            logger.error(f"Failed to send post: '{post.title}' to Telegram.")
+                    finally:
+                        window.release()
+            finally:
+                producer.cancel()
+
+            if not sent:
+                logger.info("No new posts were sent in this run.")
+            self.source.commit(seen, len([post for post in posts if post.key not in pending_keys]))
+
+        except httpx.HTTPError as e:
+            logger.error(f"Network error fetching dev.to posts: {e}")
+        except Exception as e:
+            logger.error(f"An unexpected error occurred: {e}")
+        finally:
+            jobs.prune()
+            seen.checkpoint()
+            seen.close()
+            resilience.save_latencies()
+            metrics.log_summary()
+            metrics.export()
+
+async def main(pipeline):
+    """
+    Entry point shared by the scripts. By default this runs ONCE and then
+    exits; the scheduling is handled by an external tool like cron or GitHub
+    Actions. With --daemon (RUN_MODE=daemon) it keeps polling until SIGTERM,
+    reusing warm connections and workers.
+    """
+    try:
+        if daemon.enabled():
+            logger.info(f"Starting in daemon mode, checking every {daemon.POLL_INTERVAL:.0f}s...")
+            await daemon.run_forever(pipeline.run)
+        else:
+            logger.info("Starting a single run to check for new posts...")
+            await pipeline.run()
+    finally:
+        await http_client.aclose()
+        offload.shutdown()
+    logger.info("Run finished successfully.")
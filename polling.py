@@ -0,0 +1,83 @@
+import logging
+import math
+import os
+
+import http_client
+
+logger = logging.getLogger(__name__)
+
+# --- Polling Settings ---
+# Listings are fetched conditionally: the ETag and Last-Modified of the last
+# fully processed response are kept in the seen-index, so an unchanged
+# listing costs a 304 instead of a download and a parse. The API page size
+# follows the number of new articles per poll so bursts fit in one page.
+POLL_MIN_PER_PAGE = int(os.getenv("POLL_MIN_PER_PAGE", "10"))
+POLL_MAX_PER_PAGE = int(os.getenv("POLL_MAX_PER_PAGE", "100"))
+POLL_MAX_PAGES = int(os.getenv("POLL_MAX_PAGES", "5"))  # Pages fetched at most while catching up
+POLL_HEADROOM = 1.5  # Page size relative to the expected number of new articles
+POLL_RATE_SMOOTHING = 0.3  # Weight of the latest poll in the moving average
+
+# (response header, request header) pairs
+VALIDATORS = (("ETag", "If-None-Match"), ("Last-Modified", "If-Modified-Since"))
+
+class ConditionalPoll:
+    """
+    Conditional GET of one URL, with validators stored in a SeenIndex.
+    Call commit() once the response has been processed.
+    """
+
+    def __init__(self, seen, url):
+        self.seen = seen
+        self.url = url
+        self.response = None
+
+    def _meta_name(self, header):
+        return f"{header.lower()}:{self.url}"
+
+    async def get(self, **kwargs):
+        """Fetch the URL, sending the stored validators; check `unchanged` after"""
+        headers = dict(kwargs.pop("headers", None) or {})
+        for response_header, request_header in VALIDATORS:
+            value = self.seen.get_meta(self._meta_name(response_header))
+            if value:
+                headers[request_header] = value
+        self.response = await http_client.get(self.url, headers=headers, **kwargs)
+        if self.unchanged:
+            logger.info(f"{self.url} has not changed since the last poll")
+        return self.response
+
+    @property
+    def unchanged(self):
+        return self.response is not None and self.response.status_code == 304
+
+    def commit(self):
+        """
+        Store the validators of a processed response. While articles are still
+        waiting for a retry they are cleared instead, since the retry needs the
+        full listing again.
+        """
+        if self.response is None or self.unchanged or self.response.status_code != 200:
+            return
+        keep = not self.seen.has_pending()
+        for response_header, _ in VALIDATORS:
+            self.seen.set_meta(self._meta_name(response_header), self.response.headers.get(response_header) if keep else None)
+
+def per_page(seen):
+    """Page size to request, sized by update_per_page after the previous poll"""
+    return int(seen.get_meta("per_page") or POLL_MIN_PER_PAGE)
+
+def update_per_page(seen, new_articles):
+    """
+    Fold the number of new articles seen in this poll into the moving average
+    and size the next page to fit it with some headroom (in steps of 10).
+    """
+    previous = seen.get_meta("new_per_poll")
+    rate = new_articles if previous is None else (
+        POLL_RATE_SMOOTHING * new_articles + (1 - POLL_RATE_SMOOTHING) * float(previous)
+    )
+    seen.set_meta("new_per_poll", str(rate))
+    size = min(POLL_MAX_PER_PAGE, max(POLL_MIN_PER_PAGE, math.ceil(rate * POLL_HEADROOM / 10) * 10))
+    if size != per_page(seen):
+        logger.info(f"Adjusting page size to {size} ({rate:.1f} new articles per poll)")
+    seen.set_meta("per_page", str(size))
+    return size
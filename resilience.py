@@ -0,0 +1,296 @@
+from collections import deque
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import httpx
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Resilience Settings ---
+# Calls to dev.to, pollinations and Telegram are retried on transient
+# failures (connection errors, timeouts, 5xx and 429 answers) with jittered
+# exponential backoff. A host that keeps failing trips its circuit breaker,
+# so further calls fail fast until BREAKER_RESET_TIMEOUT seconds later a
+# single probe is let through. Timeouts are capped by the deadline of the
+# surrounding work (see deadline()), so a hung call cannot outlive it.
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))  # Seconds, doubled per attempt
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "10"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "60"))
+# A hedged call sends a second, identical request once the first has taken
+# longer than the HEDGE_QUANTILE of recent latencies; the first answer wins.
+# The latencies are saved to HEDGE_LATENCY_PATH after every run, so hedging
+# also works when each run is a separate process (cron, Actions).
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "1") == "1"
+HEDGE_LATENCY_PATH = os.getenv("HEDGE_LATENCY_PATH", os.path.join("state", "hedge_latency.json"))
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # Latencies needed before hedging starts
+HEDGE_WINDOW = 200  # Recent latencies kept per hedged call
+
+class CircuitOpenError(httpx.HTTPError):
+    """The host's circuit breaker is open; the call was not attempted"""
+
+class DeadlineExceeded(httpx.HTTPError):
+    """The deadline of the surrounding work has passed"""
+
+# --- Deadlines ---
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+@contextmanager
+def deadline(seconds):
+    """
+    Bound the enclosed work to seconds from now. Deadlines nest (the earliest
+    wins) and are inherited by tasks started inside the block.
+    """
+    moment = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(moment if current is None else min(current, moment))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def time_left():
+    """Seconds until the current deadline, or None without one"""
+    moment = _deadline.get()
+    return None if moment is None else moment - time.monotonic()
+
+def timeout_for(timeout):
+    """timeout capped by the current deadline; raises DeadlineExceeded once it has passed"""
+    left = time_left()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+# --- Circuit breakers ---
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds; then lets one probe through, closing again if it
+    succeeds and reopening if it fails.
+    """
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or BREAKER_RESET_TIMEOUT
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if self.probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"Circuit breaker for {self.name} is open")
+            self.probing = True
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit breaker for {self.name} closed again")
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release_probe(self):
+        """The probe ended without telling anything about the host (e.g. it was cancelled)"""
+        with self.lock:
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                logger.warning(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+                metrics.record_circuit_open(self.name)
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def breaker(name):
+    """The shared circuit breaker for a host"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+# --- Retries ---
+
+def is_transient(error):
+    """Errors worth retrying: connection problems and timeouts, but not our own deadline or breaker"""
+    return isinstance(error, httpx.TransportError)
+
+def is_transient_response(response):
+    return response.status_code == 429 or response.status_code >= 500
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, at least retry_after when the server asked for it"""
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, RETRY_MAX_DELAY))
+    return delay
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+async def call(name, fn, *args, attempts=None, **kwargs):
+    """
+    Await fn(*args, **kwargs) (an HTTP call returning an httpx.Response)
+    behind the circuit breaker of name, retrying transient failures up to
+    attempts times. A transient response is returned as is after the last
+    attempt; 429 answers are retried but do not count against the breaker.
+    """
+    attempts = attempts or RETRY_ATTEMPTS
+    circuit = breaker(name)
+    for attempt in range(1, attempts + 1):
+        circuit.before_call()
+        retry_after = None
+        try:
+            response = await fn(*args, **kwargs)
+        except Exception as e:
+            if not is_transient(e):
+                circuit.release_probe()
+                raise
+            circuit.record_failure()
+            if attempt == attempts:
+                raise
+            logger.warning(f"Request to {name} failed ({e!r}), retrying")
+        except BaseException:
+            circuit.release_probe()
+            raise
+        else:
+            if not is_transient_response(response):
+                circuit.record_success()
+                return response
+            if response.status_code == 429:
+                circuit.release_probe()
+            else:
+                circuit.record_failure()
+            if attempt == attempts:
+                return response
+            retry_after = _retry_after(response)
+            logger.warning(f"Request to {name} answered {response.status_code}, retrying")
+
+        delay = backoff_delay(attempt, retry_after)
+        left = time_left()
+        if left is not None and delay >= left:
+            raise DeadlineExceeded(f"No time left to retry {name}")
+        metrics.record_retry(name)
+        await asyncio.sleep(delay)
+
+# --- Hedged requests ---
+
+class LatencyTracker:
+    """Recent latencies of one kind of call, for the hedging delay"""
+
+    def __init__(self, window=HEDGE_WINDOW, samples=()):
+        self.samples = deque(samples, maxlen=window)
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+
+    def hedge_delay(self):
+        """The HEDGE_QUANTILE latency, or None until enough calls were seen"""
+        if not HEDGE_REQUESTS or len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(HEDGE_QUANTILE * len(ordered)))]
+
+_trackers = None
+
+def _load_trackers(path=None):
+    path = path or HEDGE_LATENCY_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {name: LatencyTracker(samples=samples) for name, samples in json.load(f).items()}
+    except (OSError, ValueError, AttributeError, TypeError) as e:
+        logger.debug(f"No stored latencies in {path}: {e}")
+        return {}
+
+def latency_tracker(name):
+    """The latency tracker of a kind of hedged call, seeded from earlier runs"""
+    global _trackers
+    if _trackers is None:
+        _trackers = _load_trackers()
+    if name not in _trackers:
+        _trackers[name] = LatencyTracker()
+    return _trackers[name]
+
+def save_latencies(path=None):
+    """Store the recent latencies of hedged calls for the next run"""
+    if not _trackers:
+        return
+    path = path or HEDGE_LATENCY_PATH
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({name: list(tracker.samples) for name, tracker in _trackers.items()}, f)
+        os.replace(temporary_path, path)
+    except OSError as e:
+        logger.warning(f"Could not store hedging latencies in {path}: {e}")
+
+async def _with_permit(limit, fn, *args, **kwargs):
+    async with limit:
+        return await fn(*args, **kwargs)
+
+async def hedged(name, fn, *args, hedge_limit=None, **kwargs):
+    """
+    Await fn(*args, **kwargs); if it is slower than usual for name, start an
+    identical second call and return whichever succeeds first, cancelling
+    the other. Only use this for calls that are safe to repeat. If the caller
+    holds a permit of the semaphore hedge_limit for the first call, the
+    second one waits for a permit of its own.
+    """
+    tracker = latency_tracker(name)
+    delay = tracker.hedge_delay()
+    start = time.perf_counter()
+    first = asyncio.ensure_future(fn(*args, **kwargs))
+    if delay is None:
+        result = await first
+        tracker.observe(time.perf_counter() - start)
+        return result
+
+    pending = {first}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            metrics.record_hedge(name)
+            second = fn(*args, **kwargs) if hedge_limit is None else _with_permit(hedge_limit, fn, *args, **kwargs)
+            pending.add(asyncio.ensure_future(second))
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    tracker.observe(time.perf_counter() - start)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+import heapq
+import logging
+import math
+import os
+import statistics
+import time
+
+from translation import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# --- Scheduling Settings ---
+# The posts of a run are prepared in order of priority rather than listing
+# order: engagement (reactions and comments), plus a bonus for PRIORITY_TAGS.
+# RUN_COST_BUDGET caps the estimated AI tokens (translation or summary) a run
+# spends, counted from the length of the field each flow sends to the AI
+# (its Scheduler's cost_field). Posts listed before that text is fetched,
+# as in the HTML flows, are estimated from their listed reading time.
+# RUN_TIME_BUDGET stops starting new posts once the next one would likely
+# not finish in time. Posts left over are deferred to the next run, ahead of
+# newer ones, until they are older than DEFER_MAX_AGE. A budget of 0 means
+# unlimited.
+RUN_TIME_BUDGET = float(os.getenv("RUN_TIME_BUDGET", "0"))  # Seconds
+RUN_COST_BUDGET = int(os.getenv("RUN_COST_BUDGET", "0"))  # Estimated tokens
+PRIORITY_TAGS = frozenset(tag.strip().lower() for tag in os.getenv("PRIORITY_TAGS", "").split(",") if tag.strip())
+DEFER_MAX_AGE = float(os.getenv("DEFER_MAX_AGE_HOURS", "3")) * 3600
+TAG_BONUS = 2.0
+COMMENT_WEIGHT = 0.5
+WORDS_PER_MINUTE = 265  # dev.to's reading time estimate
+CHARS_PER_WORD = 6
+DEFAULT_COST = 1000  # Tokens, for posts without any length to go by
+
+def priority(post, priority_tags=PRIORITY_TAGS):
+    """Engagement score of a post: log-scaled reactions and comments, plus the tag bonus"""
+    data = post.data
+    score = math.log1p(data.get("reactions") or 0) + COMMENT_WEIGHT * math.log1p(data.get("comments_count") or 0)
+    if priority_tags and priority_tags.intersection(tag.lower() for tag in data.get("tags") or ()):
+        score += TAG_BONUS
+    return score
+
+def estimated_cost(post, field="text"):
+    """AI tokens preparing the post is expected to take: those of data[field], else from its reading time"""
+    data = post.data
+    if data.get(field):
+        return estimate_tokens(data[field])
+    if data.get("reading_time_minutes"):
+        return data["reading_time_minutes"] * WORDS_PER_MINUTE * CHARS_PER_WORD // CHARS_PER_TOKEN
+    return DEFAULT_COST
+
+class Scheduler:
+    """
+    Orders a run's posts by priority and keeps the run within its time and
+    cost budgets. cost_field is the post data sent to the AI.
+    """
+
+    def __init__(self, time_budget=None, cost_budget=None, priority_tags=None, cost_field="text"):
+        self.time_budget = RUN_TIME_BUDGET if time_budget is None else time_budget
+        self.cost_budget = RUN_COST_BUDGET if cost_budget is None else cost_budget
+        self.priority_tags = PRIORITY_TAGS if priority_tags is None else frozenset(priority_tags)
+        self.cost_field = cost_field
+        self.started = time.monotonic()
+        self.durations = []
+
+    def plan(self, posts, first=()):
+        """
+        Split posts into those to prepare, in order, and those deferred by
+        the cost budget. Keys in first (posts carried over from earlier runs)
+        go before the rest; ties keep the listing order. At least one post is
+        always planned.
+        """
+        self.started = time.monotonic()
+        self.durations = []
+        queue = [(post.key not in first, -priority(post, self.priority_tags), index, post)
+                 for index, post in enumerate(posts)]
+        heapq.heapify(queue)
+        planned, deferred = [], []
+        spent = 0
+        while queue:
+            *_, post = heapq.heappop(queue)
+            cost = estimated_cost(post, self.cost_field)
+            if self.cost_budget and planned and spent + cost > self.cost_budget:
+                deferred.append(post)
+                continue
+            spent += cost
+            planned.append(post)
+        if deferred:
+            logger.info(f"Cost budget of {self.cost_budget} tokens reached, deferring {len(deferred)} posts")
+        return planned, deferred
+
+    def observe(self, seconds):
+        """Time a post took from being started to being sent"""
+        self.durations.append(seconds)
+
+    def has_time(self):
+        """True if a post started now would likely finish within the time budget"""
+        if not self.time_budget:
+            return True
+        expected = statistics.median(self.durations) if self.durations else 0
+        return time.monotonic() - self.started + expected <= self.time_budget
+
+    def expired(self, post):
+        """True if a deferred post is too old to be worth another run"""
+        return (datetime.now(timezone.utc) - post.published_at).total_seconds() > DEFER_MAX_AGE
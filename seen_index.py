@@ -0,0 +1,233 @@
+import sqlite3
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# --- Seen Index Settings ---
+# Durable record of every article a script has handled, so that "new" means
+# "not handled yet" instead of "published in the last 30 minutes". Slow or
+# skipped runs resume from the stored high-water mark and overlapping runs
+# cannot claim the same article twice.
+SEEN_INDEX_PATH = os.getenv("SEEN_INDEX_PATH", os.path.join("state", "seen_index.sqlite3"))
+# Legacy high-water mark, used to seed a new index unless it is older than
+# DEFAULT_LOOKBACK (a stale file would otherwise replay MAX_LOOKBACK of posts)
+LAST_CHECK_PATH = "last_check.json"
+DEFAULT_LOOKBACK = timedelta(minutes=30)  # First run without any stored state
+MAX_LOOKBACK = timedelta(hours=int(os.getenv("MAX_LOOKBACK_HOURS", "3")))  # Never go further back than this
+LISTING_GRACE = timedelta(minutes=5)  # Posts can show up in listings slightly after their timestamp
+CLAIM_TIMEOUT = timedelta(minutes=30)  # Claims older than this belong to a crashed run
+MAX_ATTEMPTS = 3  # Failed articles are retried this many times before being dropped
+
+# Article states
+CLAIMED = "claimed"
+SENT = "sent"
+FAILED = "failed"
+DROPPED = "dropped"
+SKIPPED = "skipped"  # Not worth publishing, e.g. a near-duplicate of an earlier post
+DEFERRED = "deferred"  # Left for the next run by the scheduler's budget
+PENDING_STATES = (CLAIMED, FAILED, DEFERRED)
+FINAL_STATES = (SENT, DROPPED, SKIPPED)
+
+def canonical_url(url):
+    """Normalize an article URL so that tracking parameters don't defeat dedup"""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), '', ''))
+
+def _utc_iso(moment):
+    return moment.astimezone(timezone.utc).isoformat()
+
+def _read_last_check(path):
+    try:
+        with open(path) as f:
+            last_check = datetime.fromisoformat(json.load(f)["last_check"])
+    except (OSError, KeyError, ValueError) as e:
+        logger.debug(f"No usable legacy last check in {path}: {e}")
+        return None
+    if last_check < datetime.now(timezone.utc) - DEFAULT_LOOKBACK:
+        logger.debug(f"Ignoring legacy last check {last_check} in {path}: older than the default lookback")
+        return None
+    return last_check
+
+class SeenIndex:
+    """
+    SQLite-backed index of handled articles for one script (the scope).
+    Keys are article ids for the REST API and canonical URLs for HTML listings.
+    """
+
+    def __init__(self, scope, path=SEEN_INDEX_PATH):
+        self.scope = scope
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                state TEXT NOT NULL,
+                published_at TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (scope, key)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                scope TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (scope, name)
+            );
+        """)
+        # Handled keys are kept in memory so the common "already seen" check is O(1)
+        self._handled = {
+            key for (key,) in self.conn.execute(
+                "SELECT key FROM articles WHERE scope = ? AND state IN (?, ?, ?)", (scope, *FINAL_STATES)
+            )
+        }
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- Meta values ---
+
+    def get_meta(self, name):
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE scope = ? AND name = ?", (self.scope, name)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (scope, name, value) VALUES (?, ?, ?)", (self.scope, name, value)
+        )
+
+    # --- High-water mark ---
+
+    def high_water_mark(self):
+        """Publish time up to which every article has been handled, or None"""
+        value = self.get_meta("high_water_mark")
+        if value:
+            return datetime.fromisoformat(value)
+        return _read_last_check(LAST_CHECK_PATH)
+
+    def threshold(self, now=None):
+        """Oldest publish time a run still needs to look at"""
+        now = now or datetime.now(timezone.utc)
+        high_water_mark = self.high_water_mark()
+        if high_water_mark is None:
+            return now - DEFAULT_LOOKBACK
+        return max(high_water_mark - LISTING_GRACE, now - MAX_LOOKBACK)
+
+    def checkpoint(self):
+        """
+        Store the new high-water mark: the newest handled article, held back
+        to just before the oldest article that is still waiting for a retry.
+        """
+        newest_handled = self.conn.execute(
+            "SELECT MAX(published_at) FROM articles WHERE scope = ? AND state IN (?, ?, ?)",
+            (self.scope, *FINAL_STATES)
+        ).fetchone()[0]
+        oldest_pending = self.conn.execute(
+            "SELECT MIN(published_at) FROM articles WHERE scope = ? AND state IN (?, ?, ?)",
+            (self.scope, *PENDING_STATES)
+        ).fetchone()[0]
+        if newest_handled is None:
+            return
+        high_water_mark = datetime.fromisoformat(newest_handled)
+        if oldest_pending is not None:
+            high_water_mark = min(high_water_mark, datetime.fromisoformat(oldest_pending) - timedelta(seconds=1))
+        previous = self.high_water_mark()
+        if previous is None or high_water_mark > previous:
+            self.set_meta("high_water_mark", _utc_iso(high_water_mark))
+            logger.info(f"Advanced high-water mark to {high_water_mark}")
+
+    # --- Article states ---
+
+    def is_handled(self, key):
+        """True if the article was already sent or given up on"""
+        return key in self._handled
+
+    def has_pending(self):
+        """True if some article is still claimed or waiting for a retry"""
+        return self.conn.execute(
+            "SELECT 1 FROM articles WHERE scope = ? AND state IN (?, ?, ?) LIMIT 1", (self.scope, *PENDING_STATES)
+        ).fetchone() is not None
+
+    def claim(self, key, published_at):
+        """
+        Atomically claim an article for this run. Returns False if it was
+        already handled or is being worked on by another run.
+        """
+        if key in self._handled:
+            return False
+        now = datetime.now(timezone.utc)
+        stale_before = _utc_iso(now - CLAIM_TIMEOUT)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT state, updated_at FROM articles WHERE scope = ? AND key = ?", (self.scope, key)
+            ).fetchone()
+            if row is not None:
+                state, updated_at = row
+                if state in FINAL_STATES:
+                    self._handled.add(key)
+                    self.conn.execute("COMMIT")
+                    return False
+                if state == CLAIMED and updated_at > stale_before:
+                    self.conn.execute("COMMIT")
+                    return False
+            self.conn.execute(
+                """INSERT INTO articles (scope, key, state, published_at, updated_at) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (scope, key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at""",
+                (self.scope, key, CLAIMED, _utc_iso(published_at), _utc_iso(now))
+            )
+            self.conn.execute("COMMIT")
+            return True
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def mark_sent(self, key):
+        self._set_state(key, SENT)
+        self._handled.add(key)
+
+    def mark_skipped(self, key):
+        self._set_state(key, SKIPPED)
+        self._handled.add(key)
+
+    def mark_deferred(self, key):
+        """Release a claimed article to the next run without counting an attempt"""
+        self._set_state(key, DEFERRED)
+
+    def mark_failed(self, key):
+        """Record a failed attempt; the article is dropped after MAX_ATTEMPTS"""
+        self.conn.execute(
+            "UPDATE articles SET attempts = attempts + 1, updated_at = ? WHERE scope = ? AND key = ?",
+            (_utc_iso(datetime.now(timezone.utc)), self.scope, key)
+        )
+        (attempts,) = self.conn.execute(
+            "SELECT attempts FROM articles WHERE scope = ? AND key = ?", (self.scope, key)
+        ).fetchone()
+        if attempts >= MAX_ATTEMPTS:
+            logger.warning(f"Giving up on {key} after {attempts} failed attempts")
+            self._set_state(key, DROPPED)
+            self._handled.add(key)
+        else:
+            self._set_state(key, FAILED)
+
+    def _set_state(self, key, state):
+        self.conn.execute(
+            "UPDATE articles SET state = ?, updated_at = ? WHERE scope = ? AND key = ?",
+            (state, _utc_iso(datetime.now(timezone.utc)), self.scope, key)
+        )
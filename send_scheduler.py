@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Telegram Rate Limit Settings ---
+# Sends are paced by token buckets that model the Bot API limits instead of
+# fixed sleeps: about 30 messages per second overall and 20 messages per
+# minute into the same group or channel. When Telegram still answers 429,
+# the chat is paused for the retry_after it asks for and the send is retried.
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # Messages per second
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "20"))  # Messages per minute per chat
+TELEGRAM_CHAT_BURST = int(os.getenv("TELEGRAM_CHAT_BURST", "3"))  # Messages a chat may get back to back
+TELEGRAM_MAX_SEND_ATTEMPTS = int(os.getenv("TELEGRAM_MAX_SEND_ATTEMPTS", "3"))
+
+class TokenBucket:
+    """
+    Token bucket handing out reservations. A reservation takes its tokens
+    right away (the balance may go negative) and returns how long the caller
+    must wait before using them, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate  # Tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, cost=1):
+        """Take cost tokens and return the delay in seconds before they may be used"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(delay, self.blocked_until - now)
+
+    def block(self, seconds):
+        """Hand out nothing for the next seconds, e.g. after a 429"""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            # Reservations made meanwhile queue up behind the pause
+            self.tokens = min(self.tokens, 0)
+            self.updated = max(self.updated, now)
+
+def retry_after_seconds(error):
+    """
+    Seconds Telegram asked us to wait, from the retry_after of a
+    telegram_api.TelegramError; None if it is not a flood error.
+    """
+    retry_after = getattr(error, 'retry_after', None)
+    return float(retry_after) if retry_after is not None else None
+
+class SendScheduler:
+    """Paces Telegram sends under a global bucket and one bucket per chat"""
+
+    def __init__(self, global_rate=None, chat_rate=None, chat_burst=None):
+        global_rate = global_rate or TELEGRAM_GLOBAL_RATE
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = (chat_rate or TELEGRAM_CHAT_RATE) / 60
+        self.chat_burst = chat_burst or TELEGRAM_CHAT_BURST
+        self.chat_buckets = {}
+        self.lock = threading.Lock()
+
+    def chat_bucket(self, chat_id):
+        with self.lock:
+            if chat_id not in self.chat_buckets:
+                self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            return self.chat_buckets[chat_id]
+
+    def reserve(self, chat_id, cost=1):
+        """Delay before a send of cost messages into chat_id may go out"""
+        return max(self.chat_bucket(chat_id).reserve(cost), self.global_bucket.reserve(cost))
+
+    def backoff(self, chat_id, seconds):
+        logger.warning(f"Telegram flood limit hit for chat {chat_id}, pausing it for {seconds:.0f}s")
+        metrics.record_retry("telegram")
+        self.chat_bucket(chat_id).block(seconds)
+
+    async def send(self, chat_id, send_fn, /, *args, cost=1, **kwargs):
+        """
+        Await send_fn(*args, **kwargs) once the rate limits allow it, retrying
+        after the requested pause when it raises a TelegramError with
+        retry_after (a 429 flood error). cost is the number of messages the
+        call posts (e.g. a media group). Returns the call's result.
+        """
+        for attempt in range(1, TELEGRAM_MAX_SEND_ATTEMPTS + 1):
+            delay = self.reserve(chat_id, cost)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await send_fn(*args, **kwargs)
+            except Exception as e:
+                retry_after = retry_after_seconds(e)
+                if retry_after is None or attempt == TELEGRAM_MAX_SEND_ATTEMPTS:
+                    raise
+            self.backoff(chat_id, retry_after)
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """Return the shared send scheduler, so every sender shares the same limits"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SendScheduler()
+        return _scheduler
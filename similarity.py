@@ -0,0 +1,161 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# --- Similarity Index Settings ---
+# dev.to shows re-posts and series parts whose bodies are nearly identical.
+# Every post's text is reduced to a MinHash signature over its word
+# shingles (one-permutation hashing: one hash per shingle, the minimum kept
+# in each of MINHASH_BINS bins, empty bins filled from their neighbours so
+# short texts stay comparable). Signatures are split into LSH bands stored
+# in SQLite, so finding the posts that share a band with a new one is a few
+# indexed lookups no matter how long the history is. Candidates whose
+# estimated Jaccard similarity reaches DUPLICATE_THRESHOLD are duplicates.
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", os.path.join("state", "similarity_index.sqlite3"))
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.8"))
+SIMILARITY_RETENTION = timedelta(days=int(os.getenv("SIMILARITY_RETENTION_DAYS", "180")))
+SHINGLE_SIZE = 5  # Words per shingle
+MINHASH_BINS = 64
+BIN_BITS = 6  # log2(MINHASH_BINS)
+LSH_BANDS = 16  # Of 4 rows each: posts sharing ~50% of their shingles become candidates
+WORD_PATTERN = re.compile(r"\w+")
+
+def shingles(text, size=SHINGLE_SIZE):
+    """64-bit hashes of the text's overlapping runs of size words, case and punctuation ignored"""
+    words = WORD_PATTERN.findall(text.lower())
+    runs = {" ".join(words[start:start + size]) for start in range(max(1, len(words) - size + 1))}
+    return {int.from_bytes(hashlib.blake2b(run.encode('utf-8'), digest_size=8).digest(), "little")
+            for run in runs if run}
+
+def signature(text):
+    """MinHash signature of text, MINHASH_BINS values; None for text without words"""
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    empty = 1 << 64
+    bins = [empty] * MINHASH_BINS
+    for value in hashes:
+        index = value & (MINHASH_BINS - 1)
+        value >>= BIN_BITS
+        if value < bins[index]:
+            bins[index] = value
+    # An empty bin borrows the value of the next filled one, offset by the
+    # distance so that borrowed values only match equally borrowed ones
+    offset = 1 << (64 - BIN_BITS)
+    filled = [index for index, value in enumerate(bins) if value != empty]
+    result = list(bins)
+    for index, value in enumerate(bins):
+        if value == empty:
+            source = next((i for i in filled if i > index), filled[0] + MINHASH_BINS)
+            result[index] = bins[source % MINHASH_BINS] + (source - index) * offset
+    return result
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+def band_hashes(sig):
+    """One bucket per LSH band: a hash of the band's rows"""
+    rows = len(sig) // LSH_BANDS
+    return [int.from_bytes(hashlib.blake2b(array('Q', sig[band * rows:(band + 1) * rows]).tobytes(),
+                                           digest_size=8).digest(), "little", signed=True)
+            for band in range(LSH_BANDS)]
+
+class SimilarityIndex:
+    """MinHash signatures of earlier posts per script (the scope), with their LSH buckets in SQLite"""
+
+    def __init__(self, path=SIMILARITY_INDEX_PATH, retention=SIMILARITY_RETENTION):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                title TEXT,
+                url TEXT,
+                signature BLOB NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (scope, key)
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                scope TEXT NOT NULL,
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (scope, band, bucket);
+            CREATE INDEX IF NOT EXISTS buckets_key ON buckets (scope, key);
+        """)
+        self.prune(retention)
+
+    def close(self):
+        self.conn.close()
+
+    def find(self, scope, sig, exclude_key=None):
+        """
+        The most similar earlier post as (key, title, url, similarity) if it
+        reaches DUPLICATE_THRESHOLD, else None
+        """
+        candidates = set()
+        for band, bucket in enumerate(band_hashes(sig)):
+            candidates.update(key for (key,) in self.conn.execute(
+                "SELECT key FROM buckets WHERE scope = ? AND band = ? AND bucket = ?", (scope, band, bucket)
+            ))
+        candidates.discard(exclude_key)
+        best = None
+        for key in candidates:
+            row = self.conn.execute(
+                "SELECT title, url, signature FROM signatures WHERE scope = ? AND key = ?", (scope, key)
+            ).fetchone()
+            if row is None:
+                continue
+            score = similarity(sig, array('Q', row[2]))
+            if score >= DUPLICATE_THRESHOLD and (best is None or score > best[3]):
+                best = (key, row[0], row[1], score)
+        return best
+
+    def add(self, scope, key, title, url, sig):
+        """Remember a post's signature, replacing an earlier one of the same post"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM buckets WHERE scope = ? AND key = ?", (scope, key))
+            self.conn.execute(
+                """INSERT OR REPLACE INTO signatures (scope, key, title, url, signature, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (scope, key, title, url, array('Q', sig).tobytes(), datetime.now(timezone.utc).isoformat())
+            )
+            self.conn.executemany(
+                "INSERT INTO buckets (scope, band, bucket, key) VALUES (?, ?, ?, ?)",
+                [(scope, band, bucket, key) for band, bucket in enumerate(band_hashes(sig))]
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def prune(self, retention):
+        """Forget posts older than retention"""
+        cutoff = (datetime.now(timezone.utc) - retention).isoformat()
+        self.conn.execute(
+            """DELETE FROM buckets WHERE EXISTS (SELECT 1 FROM signatures WHERE signatures.scope = buckets.scope
+               AND signatures.key = buckets.key AND signatures.created_at < ?)""", (cutoff,)
+        )
+        self.conn.execute("DELETE FROM signatures WHERE created_at < ?", (cutoff,))
+
+_index = None
+
+def get_index():
+    """Return the shared similarity index, opening it on first use"""
+    global _index
+    if _index is None:
+        _index = SimilarityIndex()
+    return _index
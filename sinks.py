@@ -0,0 +1,106 @@
+import logging
+from urllib.parse import urljoin
+
+import telegram_api
+from pipeline import Sink
+
+logger = logging.getLogger(__name__)
+
+class CardPairSink(Sink):
+    """The original and the translated card as one album (scrap2)"""
+    name = "card_pair"
+
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+
+    async def send(self, post):
+        await self.send_once(post, "cards_sent", telegram_api.send_media_group, self.chat_id, [
+            {"photo": post.data["original_image"], "caption": f"**{post.title}**\n\n[مطالعه بیشتر]({post.url})",
+             "parse_mode": "Markdown"},
+            {"photo": post.data["translated_image"],
+             "caption": f"ترجمه فارسی پست:\n\n[مطالعه متن اصلی]({post.url})", "parse_mode": "Markdown"},
+        ])
+        logger.info(f"Successfully sent post '{post.title}' with translation to Telegram")
+        return True
+
+class PhotoWithTranslationSink(Sink):
+    """
+    The post's own image with title and link, then the translated text in a
+    separate message (photo+textPers). Without a usable image the title and
+    link are sent as text.
+    """
+    name = "photo_with_translation"
+
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+
+    async def send(self, post):
+        caption = f"**{post.title}**\n\n[مطالعه بیشتر]({post.url})"
+        image_bytes = post.data.get("image_bytes")
+        if "original_sent" not in post.done:
+            if image_bytes:
+                try:
+                    await self.send_once(post, "original_sent", telegram_api.send_photo, self.chat_id, image_bytes,
+                                         caption=caption, parse_mode="Markdown")
+                    logger.info(f"Successfully sent original image for '{post.title}'")
+                except Exception as e:
+                    logger.error(f"Error sending original image or initial caption: {e}")
+            else:
+                logger.info(f"No image found for '{post.title}', sending text-only caption.")
+            # Prevent automatic preview if no image
+            await self.send_once(post, "original_sent", telegram_api.send_message, self.chat_id, caption,
+                                 parse_mode="Markdown", disable_web_page_preview=True)
+
+        translated_text = post.data.get("translation")
+        if translated_text:
+            # Assuming AI provides markdown-compatible text
+            await self.send_once(post, "translation_sent", telegram_api.send_message, self.chat_id, translated_text,
+                                 parse_mode="Markdown")
+            logger.info(f"Successfully sent translated text for '{post.title}'")
+        else:
+            logger.warning(f"No translated text received for '{post.title}'.")
+        return True
+
+def comments_message(url, top_comments):
+    message = "<b>💬 ۵ کامنت برتر:</b>\n\n"
+    for comment in top_comments:
+        username = comment.get("user", {}).get("username", "ناشناس")
+        comment_body = comment.get("body_html", "")[:200]  # محدود به 200 کاراکتر
+        reactions = comment.get("positive_reactions_count", 0)
+        message += f"👤 <b>{username}</b>: {comment_body}\n❤️ {reactions} لایک\n\n"
+    return message + f"📜 <a href='{urljoin(url, '#comments')}'>مشاهده همه کامنت‌ها</a>"
+
+class ArticleSink(Sink):
+    """
+    An API article with its summary and hashtags, as a photo when it has a
+    cover or generated image, followed by its top comments as a reply
+    (scrapbyapi). Failing to send the comments does not fail the post.
+    """
+    name = "article"
+
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+
+    async def send(self, post):
+        hashtags = " ".join([f"#{tag}" for tag in post.data.get("tags", [])])
+        message = (f"<b>{post.title}</b>\n\n{post.data['summary']}\n\n{hashtags}\n"
+                   f"📖 <a href='{post.url}'>خواندن مقاله کامل</a>")
+
+        photo = post.data.get("cover_image") or post.data.get("default_image")
+        if photo:
+            message_id = await self.send_once(post, "article_sent", telegram_api.send_photo, self.chat_id, photo,
+                                              caption=message, parse_mode="HTML")
+        else:
+            message_id = await self.send_once(post, "article_sent", telegram_api.send_message, self.chat_id, message,
+                                              parse_mode="HTML")
+
+        top_comments = post.data.get("top_comments")
+        if top_comments:
+            try:
+                await self.send_once(post, "comments_sent", telegram_api.send_message, self.chat_id,
+                                     comments_message(post.url, top_comments), parse_mode="HTML",
+                                     reply_to_message_id=message_id)
+                logger.info(f"Sent top comments of '{post.title}'")
+            except Exception as e:
+                logger.error(f"Error sending comments: {e}")
+        return True
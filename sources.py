@@ -0,0 +1,134 @@
+from datetime import datetime
+import logging
+
+import http_client
+import metrics
+import offload
+import polling
+from extract import parse_listing
+from pipeline import Post, Source
+from seen_index import canonical_url
+
+logger = logging.getLogger(__name__)
+
+LISTING_TIMEOUT = 10
+LISTING_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+class HtmlListingSource(Source):
+    """
+    A dev.to HTML listing such as /latest, fetched conditionally.
+    Posts are keyed by canonical URL; oldest_first publishes chronologically,
+    otherwise in listing order (newest first).
+    """
+    name = "listing"
+
+    def __init__(self, url, oldest_first=True):
+        self.url = url
+        self.oldest_first = oldest_first
+        self.poll = None
+
+    async def fetch(self, seen):
+        # An unchanged listing is answered with a 304 and skipped
+        self.poll = polling.ConditionalPoll(seen, self.url)
+        response = await self.poll.get(headers=LISTING_HEADERS, timeout=LISTING_TIMEOUT)
+        if self.poll.unchanged:
+            return []
+        response.raise_for_status()
+        metrics.record_size(self.name, len(response.content))
+
+        threshold = seen.threshold()
+        with metrics.timer("parse_listing"):
+            records = await offload.run_cpu_light(parse_listing, response.content)
+        posts = [
+            Post(key=canonical_url(record["url"]), title=record["title"], url=record["url"],
+                 published_at=record["published_at"],
+                 # Engagement and length, for the scheduler's priority and cost estimate
+                 data={name: record[name] for name in ("reactions", "comments_count", "tags", "reading_time_minutes")})
+            for record in records
+            if record["published_at"] >= threshold
+        ]
+        if self.oldest_first:
+            posts.sort(key=lambda post: post.published_at)
+        return posts
+
+    def commit(self, seen, new_posts):
+        self.poll.commit()
+
+def parse_published_at(article):
+    return datetime.fromisoformat(article["published_at"].replace("Z", "+00:00"))
+
+class ApiSource(Source):
+    """
+    The dev.to /api/articles endpoint, in API order. The first page is fetched
+    conditionally; further pages are only fetched until one reaches an article
+    that was already handled or is older than the threshold. The page size
+    follows the publish rate (see polling). Posts are keyed by article id.
+    """
+    name = "api"
+
+    def __init__(self, url_template):
+        self.url_template = url_template  # With {per_page} and {page}
+        self.poll = None
+
+    def _post(self, article):
+        tags = article.get("tag_list") or [tag.strip() for tag in article.get("tags", "").split(",") if tag.strip()]
+        return Post(
+            key=str(article["id"]), title=article["title"], url=article["url"],
+            published_at=parse_published_at(article),
+            data={
+                "article_id": article["id"],
+                "description": article.get("description", ""),
+                "cover_image": article.get("cover_image") or None,
+                # tag_list is a list; in the list API tags is a comma-separated string
+                "tags": tags,
+                # Engagement, for the scheduler's priority
+                "reactions": article.get("positive_reactions_count") or article.get("public_reactions_count") or 0,
+                "comments_count": article.get("comments_count") or 0,
+            }
+        )
+
+    async def fetch(self, seen):
+        threshold = seen.threshold()
+        size = polling.per_page(seen)
+        self.poll = polling.ConditionalPoll(seen, self.url_template.format(per_page=size, page=1))
+
+        articles = []
+        ids = set()
+        for page in range(1, polling.POLL_MAX_PAGES + 1):
+            if page == 1:
+                response = await self.poll.get(timeout=LISTING_TIMEOUT)
+                if self.poll.unchanged:
+                    return []
+            else:
+                response = await http_client.get(self.url_template.format(per_page=size, page=page),
+                                                 timeout=LISTING_TIMEOUT)
+            response.raise_for_status()
+            metrics.record_size(self.name, len(response.content))
+            batch = response.json()
+            articles.extend(article for article in batch if article.get("id") not in ids)
+            ids.update(article.get("id") for article in batch)
+
+            reached_known = any(
+                seen.is_handled(str(article["id"])) or parse_published_at(article) <= threshold
+                for article in batch
+            )
+            if reached_known or len(batch) < size:
+                break
+        else:
+            logger.warning(f"Still no known article after {polling.POLL_MAX_PAGES} pages")
+
+        posts = []
+        for article in articles:
+            try:
+                post = self._post(article)
+            except (KeyError, ValueError) as e:
+                logger.error(f"Error processing article: {e}")
+                continue
+            if post.published_at > threshold:
+                posts.append(post)
+        return posts
+
+    def commit(self, seen, new_posts):
+        # The next page size follows the number of new articles in this run
+        polling.update_per_page(seen, new_posts)
+        self.poll.commit()
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+import re
+
+import http_client
+import metrics
+import translation
+from send_scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# --- Telegram Bot API Settings ---
+# Every script talks to the Bot API through these calls, over the shared HTTP
+# pool and paced by the shared send scheduler.
+TELEGRAM_BOT_TOKEN = os.getenv("BOT_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_TIMEOUT = 30  # Photo uploads can take a while
+# Uploaded photos are remembered by a hash of their bytes (in the shared
+# cache, see translation.TranslationCache); sending the same bytes again
+# refers to Telegram's file_id instead of uploading them again.
+FILE_ID_PROMPT = "telegram-file-id"
+# Descriptions of the errors Telegram answers a stale or foreign file_id with,
+# e.g. "Bad Request: wrong file identifier/HTTP URL specified"
+BAD_FILE_ID = re.compile(r"file identifier|file_id|FILE_REFERENCE|MEDIA_EMPTY", re.IGNORECASE)
+
+class TelegramError(Exception):
+    """An unsuccessful Bot API call; retry_after is set on flood errors"""
+
+    def __init__(self, method, description, error_code=None, retry_after=None):
+        super().__init__(f"{method} failed: {description}")
+        self.method = method
+        self.description = description
+        self.error_code = error_code
+        self.retry_after = retry_after
+
+def _form_value(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+async def call(method, params=None, files=None, timeout=TELEGRAM_TIMEOUT):
+    """
+    Call a Bot API method and return its result. Uploads go as multipart
+    (files maps field names to (filename, bytes, content type)).
+    Raises TelegramError if Telegram rejects the call.
+    """
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/{method}"
+    params = {name: value for name, value in (params or {}).items() if value is not None}
+    with metrics.timer(f"telegram_{method}"):
+        if files:
+            data = {name: _form_value(value) for name, value in params.items()}
+            metrics.record_size(f"telegram_{method}", sum(len(content) for _, content, _ in files.values()))
+            response = await http_client.post(url, data=data, files=files, timeout=timeout)
+        else:
+            response = await http_client.post(url, json=params, timeout=timeout)
+
+    try:
+        body = response.json()
+    except ValueError:
+        raise TelegramError(method, f"HTTP {response.status_code}", response.status_code)
+    if not body.get("ok"):
+        raise TelegramError(method, body.get("description"), body.get("error_code"),
+                            body.get("parameters", {}).get("retry_after"))
+    return body["result"]
+
+async def send(chat_id, method, params, files=None, cost=1):
+    """Call a send method into chat_id once the send scheduler allows it"""
+    return await get_scheduler().send(chat_id, call, method, dict(params, chat_id=chat_id), files, cost=cost)
+
+def _file_key(content):
+    # file_ids are only valid for the bot that uploaded the file
+    bot_id = (TELEGRAM_BOT_TOKEN or "").partition(":")[0]
+    return translation.cache_key(FILE_ID_PROMPT, hashlib.sha256(content).hexdigest(), bot_id)
+
+def cached_file_id(content):
+    """file_id of bytes uploaded before, or None"""
+    return translation.get_cache().get(_file_key(content))
+
+def remember_file_id(content, message):
+    """Store the file_id of the largest size of the photo in a sent message"""
+    sizes = message.get("photo") if isinstance(message, dict) else None
+    if sizes:
+        translation.get_cache().put(_file_key(content), sizes[-1]["file_id"])
+
+def _is_bad_file_id(error):
+    """True if Telegram rejected a file_id; other 400s (e.g. Markdown errors) would fail again on upload"""
+    return (isinstance(error, TelegramError) and error.error_code == 400
+            and BAD_FILE_ID.search(error.description or "") is not None)
+
+async def send_photo(chat_id, photo, caption=None, parse_mode=None):
+    """
+    Send a photo given as a URL or file_id (str) or as encoded bytes. Bytes
+    that were uploaded before are sent by reference.
+    """
+    params = {"caption": caption, "parse_mode": parse_mode}
+    if not isinstance(photo, (bytes, bytearray)):
+        return await send(chat_id, "sendPhoto", dict(params, photo=photo))
+
+    file_id = cached_file_id(photo)
+    if file_id:
+        try:
+            return await send(chat_id, "sendPhoto", dict(params, photo=file_id))
+        except Exception as e:
+            if not _is_bad_file_id(e):
+                raise
+            logger.warning(f"Cached file_id was rejected, uploading again: {e}")
+    message = await send(chat_id, "sendPhoto", params, files={"photo": ("photo.jpg", bytes(photo), "image/jpeg")})
+    remember_file_id(photo, message)
+    return message
+
+async def send_media_group(chat_id, photos, reuse=True):
+    """
+    Send photos as one album in a single call. photos are dicts with photo
+    (URL, file_id or bytes) and optionally caption and parse_mode. Bytes are
+    sent by reference when they were uploaded before. Returns the messages.
+    """
+    media = []
+    files = {}
+    uploads = []
+    for index, item in enumerate(photos):
+        photo = item["photo"]
+        if isinstance(photo, (bytes, bytearray)):
+            file_id = cached_file_id(photo) if reuse else None
+            if file_id:
+                photo = file_id
+            else:
+                name = f"photo{index}"
+                files[name] = (f"{name}.jpg", bytes(photo), "image/jpeg")
+                uploads.append((index, item["photo"]))
+                photo = f"attach://{name}"
+        entry = {"type": "photo", "media": photo, "caption": item.get("caption"), "parse_mode": item.get("parse_mode")}
+        media.append({name: value for name, value in entry.items() if value is not None})
+
+    try:
+        # An album counts as one message per photo against the rate limits
+        messages = await send(chat_id, "sendMediaGroup", {"media": media}, files=files or None, cost=len(media))
+    except Exception as e:
+        if not (reuse and len(uploads) < len(photos) and _is_bad_file_id(e)):
+            raise
+        logger.warning(f"Cached file_id was rejected, uploading the album again: {e}")
+        return await send_media_group(chat_id, photos, reuse=False)
+    for index, content in uploads:
+        remember_file_id(content, messages[index])
+    return messages
+
+async def send_message(chat_id, text, parse_mode=None, reply_to_message_id=None, disable_web_page_preview=None):
+    return await send(chat_id, "sendMessage", {
+        "text": text,
+        "parse_mode": parse_mode,
+        "reply_to_message_id": reply_to_message_id,
+        "disable_web_page_preview": disable_web_page_preview,
+    })
@@ -0,0 +1,218 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from itertools import accumulate
+import functools
+import logging
+import string
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Text layout for the card renderer. Each font keeps a lookup table of glyph
+# advance widths, so wrapping a paragraph is a prefix sum over its glyph
+# widths and a binary search per line instead of a Pillow measurement per
+# line. Right-to-left paragraphs (Persian translations) are right-aligned
+# and, when Pillow lacks libraqm, put into visual order here.
+
+ELLIPSIS = "..."
+RTL_BIDI_CLASSES = ("R", "AL")
+MIRRORED = str.maketrans("()[]{}<>«»", ")(][}{><»«")
+
+class GlyphAdvances:
+    """
+    Advance widths of single characters in one font. ASCII is measured up
+    front, any other character the first time it is seen.
+    """
+
+    def __init__(self, font):
+        self.font = font
+        self.widths = {char: font.getlength(char) for char in string.printable if char.isprintable()}
+
+    def of(self, text):
+        """Width of every character of text"""
+        widths = self.widths
+        for char in set(text) - widths.keys():
+            widths[char] = self.font.getlength(char)
+        return [widths[char] for char in text]
+
+    def width(self, text):
+        return sum(self.of(text))
+
+@dataclass
+class Line:
+    text: str  # Logical order
+    width: float
+
+@dataclass
+class Block:
+    """A wrapped paragraph at one font size"""
+    size: int
+    lines: list
+    line_height: int
+    rtl: bool
+    truncated: bool = False
+
+    @property
+    def height(self):
+        return len(self.lines) * self.line_height
+
+def is_rtl(text):
+    """True if the first strongly directional character is right-to-left"""
+    for char in text:
+        direction = unicodedata.bidirectional(char)
+        if direction in RTL_BIDI_CLASSES:
+            return True
+        if direction == "L":
+            return False
+    return False
+
+def break_lines(text, widths, max_width):
+    """
+    Greedy width-exact line breaking: (start, end) ranges of text, breaking
+    at spaces and inside words only when a single word is wider than a line.
+    """
+    prefix = [0.0, *accumulate(widths)]
+    length = len(text)
+    ranges = []
+    start = 0
+    while start < length:
+        while start < length and text[start] == " ":
+            start += 1
+        if start == length:
+            break
+        # Longest run of characters from start that fits
+        end = bisect_right(prefix, prefix[start] + max_width) - 1
+        if end >= length:
+            ranges.append((start, length))
+            break
+        space = text.rfind(" ", start, end + 1)
+        if space > start:
+            end = space
+        else:
+            end = max(end, start + 1)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def wrap(text, advances, max_width):
+    """Lines of text, with surrounding whitespace collapsed, no wider than max_width"""
+    text = " ".join(text.split())
+    widths = advances.of(text)
+    lines = []
+    for start, end in break_lines(text, widths, max_width):
+        while end > start and text[end - 1] == " ":
+            end -= 1
+        lines.append(Line(text[start:end], sum(widths[start:end])))
+    return lines
+
+def truncate(line, advances, max_width):
+    """line shortened so that it fits max_width together with the ellipsis"""
+    room = max_width - advances.width(ELLIPSIS)
+    widths = advances.of(line.text)
+    end = bisect_right(list(accumulate(widths)), room)
+    text = line.text[:end].rstrip()
+    return Line(text + ELLIPSIS, advances.width(text) + advances.width(ELLIPSIS))
+
+def fit(text, advances_for_size, max_width, max_height, min_size, max_size, line_spacing, max_lines=None):
+    """
+    Wrap text at the largest font size in [min_size, max_size] whose lines
+    fit the box (and max_lines). If even min_size is too large, the text is
+    cut after the last line that fits (at least one) and, if any was
+    dropped, ends in an ellipsis.
+    """
+    rtl = is_rtl(text)
+
+    def layout(size):
+        advances = advances_for_size(size)
+        line_height = round(size * line_spacing)
+        return Block(size, wrap(text, advances, max_width), line_height, rtl)
+
+    def fits(block):
+        return block.height <= max_height and (max_lines is None or len(block.lines) <= max_lines)
+
+    # Binary search for the largest size that fits
+    low, high = min_size, max_size
+    best = None
+    while low <= high:
+        size = (low + high) // 2
+        block = layout(size)
+        if fits(block):
+            best = block
+            low = size + 1
+        else:
+            high = size - 1
+    if best is not None:
+        return best
+
+    block = layout(min_size)
+    count = max(1, min(max_height // block.line_height, max_lines or len(block.lines)))
+    if count < len(block.lines):
+        block.lines = block.lines[:count]
+        block.lines[-1] = truncate(block.lines[-1], advances_for_size(min_size), max_width)
+        block.truncated = True
+    return block
+
+def visual_order(text):
+    """
+    Reorder a right-to-left line for drawing without libraqm: runs of
+    left-to-right text (Latin words, numbers) keep their order, everything
+    else is reversed and brackets are mirrored. Neutral characters between
+    two left-to-right characters belong to the left-to-right run.
+    """
+    classes = []
+    for char in text:
+        direction = unicodedata.bidirectional(char)
+        classes.append("L" if direction in ("L", "EN", "AN") else "R" if direction in RTL_BIDI_CLASSES else "N")
+    # Resolve neutrals from the strong characters around them
+    resolved = []
+    for index, cls in enumerate(classes):
+        if cls == "N":
+            before = next((c for c in reversed(classes[:index]) if c != "N"), "R")
+            after = next((c for c in classes[index + 1:] if c != "N"), "R")
+            cls = "L" if before == after == "L" else "R"
+        resolved.append(cls)
+
+    runs = []
+    for char, cls in zip(text, resolved):
+        if runs and runs[-1][0] == cls:
+            runs[-1][1].append(char)
+        else:
+            runs.append((cls, [char]))
+    parts = []
+    for cls, chars in reversed(runs):
+        run = "".join(chars)
+        parts.append(run if cls == "L" else run[::-1].translate(MIRRORED))
+    return "".join(parts)
+
+@functools.lru_cache(maxsize=None)
+def raqm_available():
+    """
+    Pillow with libraqm shapes and reorders right-to-left text itself;
+    without it, lines are only reordered (see visual_order), not shaped
+    """
+    from PIL import features
+    return features.check("raqm")
+
+def draw_block(draw, block, font, x, y, width, fill, align=None):
+    """
+    Draw a block's lines from the top-left corner (x, y) of a box of the
+    given width. align is left, center or right; by default right-to-left
+    blocks are right-aligned and others left-aligned. Returns the y below
+    the block.
+    """
+    align = align or ("right" if block.rtl else "left")
+    for line in block.lines:
+        if align == "center":
+            line_x = x + (width - line.width) / 2
+        elif align == "right":
+            line_x = x + width - line.width
+        else:
+            line_x = x
+        if block.rtl and raqm_available():
+            draw.text((line_x, y), line.text, font=font, fill=fill, direction="rtl", language="fa")
+        elif block.rtl:
+            draw.text((line_x, y), visual_order(line.text), font=font, fill=fill)
+        else:
+            draw.text((line_x, y), line.text, font=font, fill=fill)
+        y += block.line_height
+    return y
@@ -0,0 +1,475 @@
+import asyncio
+import functools
+import logging
+import os
+import random
+import re
+
+import httpx
+
+import http_client
+import images
+import metrics
+import offload
+import resilience
+import similarity
+import translation
+from card_renderer import DEFAULT_ENCODER_PROFILE, CardJob, list_backgrounds, render_batch
+from extract import ArticleScanner, parse_article
+from pipeline import Transform
+
+logger = logging.getLogger(__name__)
+
+# --- Stage Settings ---
+# Each stage gets its own concurrency limit so that fetching and translating
+# upcoming posts overlaps with rendering and publishing the current one.
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "4"))
+TRANSLATE_CONCURRENCY = int(os.getenv("TRANSLATE_CONCURRENCY", "2"))
+# Cards requested within RENDER_BATCH_DELAY seconds of each other (e.g. the
+# original and translated cards of neighbouring posts) are rendered together.
+# Rendering has no stage limit of its own: the CPU worker pool bounds it, and
+# a limit of one card per worker would leave nothing to batch. A batch is
+# split across the workers in chunks of at least RENDER_MIN_CHUNK cards.
+RENDER_BATCH_SIZE = int(os.getenv("RENDER_BATCH_SIZE", "8"))
+RENDER_BATCH_DELAY = float(os.getenv("RENDER_BATCH_DELAY", "0.01"))
+RENDER_MIN_CHUNK = int(os.getenv("RENDER_MIN_CHUNK", "2"))
+ARTICLE_TIMEOUT = 10
+IMAGE_TIMEOUT = 10
+AI_TIMEOUT = 60  # The AI API can take a while on long posts
+IMAGE_GENERATION_TIMEOUT = 120
+
+async def chat_completion(url, messages, timeout=AI_TIMEOUT, headers=None, **params):
+    """
+    Send a chat completion request to the AI API and return the reply text.
+    Completions are safe to repeat, so transient failures are retried.
+    Raises on HTTP errors and malformed responses.
+    """
+    payload = dict(params, messages=messages)
+    headers = dict({"Content-Type": "application/json"}, **(headers or {}))
+    response = await http_client.post(url, json=payload, headers=headers, timeout=timeout,
+                                      retries=resilience.RETRY_ATTEMPTS)
+    response.raise_for_status()
+    if response.headers.get('Content-Type', '').startswith('application/json'):
+        return response.json().get("choices")[0].get("message").get("content")
+    return response.text
+
+class FetchArticle(Transform):
+    """
+    Download a post page and extract its text and first image URL into
+    data["text"] and data["image_url"]. With blocks=True the text is made of
+    paragraph blocks separated by blank lines (see extract.parse_article).
+    The page is streamed and the download stops once the article body is
+    complete (see extract.ArticleScanner).
+    """
+    name = "fetch_article"
+    concurrency = FETCH_CONCURRENCY
+
+    def __init__(self, blocks=False):
+        self.blocks = blocks
+
+    async def apply(self, post):
+        try:
+            scanner = await http_client.stream_get(post.url, lambda response: ArticleScanner(), timeout=ARTICLE_TIMEOUT)
+            metrics.record_size(self.name, scanner.size)
+            if scanner.truncated:
+                logger.warning(f"Stopped downloading '{post.title}' after {scanner.size} bytes")
+            with metrics.timer("parse"):
+                text_content, image_url = await offload.run_cpu(parse_article, scanner.content(), blocks=self.blocks)
+        except Exception as e:
+            logger.error(f"Error fetching full post content: {e}")
+            return False
+        if not text_content:
+            logger.warning(f"Could not get full text content for '{post.title}'. Skipping.")
+            return False
+        post.data["text"] = text_content
+        post.data["image_url"] = image_url
+        return True
+
+class SkipDuplicates(Transform):
+    """
+    Skip posts whose title and data[source] nearly repeat an earlier post of
+    the scope (re-posts, series parts with the same body) before anything
+    is translated or rendered for them; data["duplicate_of"] links the
+    earlier post. Only published posts are added to the similarity index,
+    so a post that fails or is dropped does not hold back its near-duplicates.
+    Near-duplicates prepared in the same run are not caught.
+    """
+    name = "dedup"
+
+    def __init__(self, scope, source="text"):
+        self.scope = scope
+        self.source = source
+
+    async def apply(self, post):
+        text = f"{post.title}\n{post.data.get(self.source) or ''}"
+        try:
+            # A few milliseconds even for a long article: not worth starting the process pool for
+            signature = await offload.run_cpu_light(similarity.signature, text)
+            if signature is None:
+                return True
+            match = similarity.get_index().find(self.scope, signature, exclude_key=post.key)
+            if match is None:
+                # Kept with the post's progress until it is sent
+                post.data["signature"] = signature
+                return True
+        except Exception as e:
+            # Publishing a duplicate beats not publishing at all
+            logger.warning(f"Could not check '{post.title}' for duplicates: {e}")
+            return True
+        key, title, url, score = match
+        post.data["duplicate_of"] = url
+        post.skipped = f"{score:.0%} similar to earlier post '{title}' ({url})"
+        return True
+
+    def sent(self, post):
+        signature = post.data.get("signature")
+        if signature is not None:
+            similarity.get_index().add(self.scope, post.key, post.title, post.url, signature)
+
+class DownloadImage(Transform):
+    """
+    Download data["image_url"] into data["image_bytes"], scaled down to what
+    Telegram keeps (see images). Downloads that turn out not to be a usable
+    photo are abandoned early. A failed download is not fatal.
+    """
+    name = "download_image"
+    concurrency = FETCH_CONCURRENCY
+    limit_name = "fetch_article"
+    resumable = False
+
+    async def apply(self, post):
+        image_url = post.data.get("image_url")
+        if not image_url:
+            return True
+        try:
+            download = await http_client.stream_get(image_url, images.PhotoDownload, timeout=IMAGE_TIMEOUT)
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not download original image from {image_url}: {e}")
+            return True
+        metrics.record_size(self.name, len(download.data))
+        content = download.content()
+        if content is None:
+            logger.warning(f"Skipping original image from {image_url}: {download.rejected}")
+            return True
+        logger.info(f"Downloaded original image ({len(content)} bytes)")
+        try:
+            post.data["image_bytes"] = await offload.run_cpu(images.fit_photo, content)
+        except Exception as e:
+            logger.warning(f"Could not read original image from {image_url}: {e}")
+        return True
+
+class PickBackground(Transform):
+    """Choose a random card background for the post into data["background"]"""
+    name = "background"
+
+    def __init__(self, backgrounds_dir):
+        self.backgrounds_dir = backgrounds_dir
+
+    async def apply(self, post):
+        backgrounds = list_backgrounds(self.backgrounds_dir)
+        if not backgrounds:
+            logger.error(f"No background images found in {self.backgrounds_dir}")
+            return False
+        post.data["background"] = random.choice(backgrounds)
+        logger.info(f"Using background image: {post.data['background']}")
+        return True
+
+async def render_cards(backgrounds_dir, jobs, profile=DEFAULT_ENCODER_PROFILE):
+    """
+    Render CardJobs in the CPU worker pool and return a RenderedCard per job.
+    Jobs are grouped by background and split into one render_batch call per
+    worker (of at least RENDER_MIN_CHUNK jobs), so a batch spreads across the
+    cores while each worker keeps drawing onto the same templates.
+    """
+    if not jobs:
+        return []
+    order = sorted(range(len(jobs)), key=lambda index: jobs[index].background_image_path)
+    chunk_size = max(RENDER_MIN_CHUNK, -(-len(jobs) // max(1, offload.CPU_WORKERS)))
+    chunks = [order[start:start + chunk_size] for start in range(0, len(order), chunk_size)]
+    rendered = await asyncio.gather(*(
+        offload.run_cpu(render_batch, backgrounds_dir, [jobs[index] for index in chunk], profile)
+        for chunk in chunks
+    ))
+    results = [None] * len(jobs)
+    for chunk, cards in zip(chunks, rendered):
+        for index, card in zip(chunk, cards):
+            results[index] = card
+    return results
+
+_render_batchers = {}
+
+def render_batcher(backgrounds_dir):
+    """The shared batcher of card renders for a backgrounds directory"""
+    if backgrounds_dir not in _render_batchers:
+        _render_batchers[backgrounds_dir] = MicroBatcher(
+            functools.partial(render_cards, backgrounds_dir), RENDER_BATCH_SIZE, RENDER_BATCH_DELAY
+        )
+    return _render_batchers[backgrounds_dir]
+
+class RenderCard(Transform):
+    """
+    Render data[source] onto the post's background; JPEG bytes into
+    data[output]. Cards of all render steps are batched (see render_cards).
+    """
+    resumable = False
+
+    def __init__(self, backgrounds_dir, source, output, title_prefix="", is_translation=False, name="render"):
+        self.backgrounds_dir = backgrounds_dir
+        self.source = source
+        self.output = output
+        self.title_prefix = title_prefix
+        self.is_translation = is_translation
+        self.name = name
+
+    async def apply(self, post):
+        background = post.data["background"]
+        if not os.path.exists(background):
+            logger.error(f"Background image not found: {background}")
+            return False
+        job = CardJob(post.data[self.source], background, f"{self.title_prefix}{post.title}", self.is_translation)
+        try:
+            card = await render_batcher(self.backgrounds_dir).submit(job)
+        except Exception as e:
+            logger.error(f"Error creating image with text: {e}")
+            return False
+        if card.error:
+            logger.error(f"Error creating image with text: {card.error}")
+            return False
+        # Drawing and encoding happen in the worker, which reports how long they took
+        metrics.observe_duration("render", card.render_seconds)
+        metrics.observe_duration("encode", card.encode_seconds)
+        metrics.record_size("encode", len(card.image_bytes))
+        logger.info(f"Generated image ({len(card.image_bytes)} bytes)")
+        post.data[self.output] = card.image_bytes
+        return True
+
+class Translate(Transform):
+    """
+    Translate data[source] into data[output] through the shared translation
+    cache, so unchanged paragraphs are never sent twice. The signature is
+    appended by us rather than by the AI, so that translations of single
+    paragraphs can be cached and stitched together. Requests that take longer
+    than usual are hedged. A failed translation fails the post, which is then
+    retried by a later run.
+    """
+    name = "translate"
+    concurrency = TRANSLATE_CONCURRENCY
+
+    def __init__(self, url, system_prompt, instruction=None, model=None, separator="\n\n", signature=None,
+                 headers=None, source="text", output="translation"):
+        self.url = url
+        self.system_prompt = system_prompt
+        self.instruction = instruction
+        self.model = model
+        self.separator = separator
+        self.signature = signature
+        self.headers = headers
+        self.source = source
+        self.output = output
+
+    async def request(self, text):
+        """One uncached translation request; None on failure so errors are never cached"""
+        user_content = f"{self.instruction}\n{text}" if self.instruction else text
+        params = {"model": self.model} if self.model else {}
+        try:
+            logger.info("Sending text for translation to AI API...")
+            metrics.record_size("translate_request", len(text.encode()))
+            with metrics.timer("translate_request"):
+                # The caller holds a translation permit; a hedged duplicate takes its own
+                return await resilience.hedged("translate", chat_completion, self.url, [
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": user_content}
+                ], hedge_limit=translation.translation_limit(), headers=self.headers, **params)
+        except Exception as e:
+            logger.error(f"Error getting AI translation: {e}")
+            return None
+
+    async def apply(self, post):
+        translated_text = await translation.translate_cached(
+            post.data[self.source], self.request, self.system_prompt + (self.instruction or ""),
+            model=self.model, separator=self.separator
+        )
+        if not translated_text:
+            logger.error("Failed to get translation from AI")
+            return False
+        post.data[self.output] = f"{translated_text}\n\n{self.signature}" if self.signature else translated_text
+        return True
+
+class MicroBatcher:
+    """
+    Collects items submitted close together (within max_delay, at most
+    max_size) and processes them with a single call of fn(items), which
+    returns one result per item.
+    """
+
+    def __init__(self, fn, max_size, max_delay=0.05):
+        self.fn = fn
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.pending = []
+        self.timer = None
+        self.tasks = set()
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_size:
+            self._flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            results = await self.fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+class Summarize(Transform):
+    """
+    Summarize data[source] into data[output]. Posts being prepared together
+    are summarized in one request of up to batch_size texts, each tagged
+    [[n]]; items missing from a batched answer are retried on their own.
+    Summaries are kept in the shared cache. The fallback text is used when
+    the AI cannot be reached.
+    """
+    name = "summarize"
+
+    def __init__(self, url, system_prompt, prompt, batch_prompt, fallback, model=None, max_tokens=150,
+                 batch_size=5, source="description", output="summary"):
+        self.url = url
+        self.system_prompt = system_prompt
+        self.prompt = prompt  # Format string with {text}
+        self.batch_prompt = batch_prompt  # Format string with {count} and {items}
+        self.fallback = fallback
+        self.model = model
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self.source = source
+        self.output = output
+        self._batcher = None
+
+    async def request(self, user_content, max_tokens):
+        """The model's reply, or None on failure"""
+        params = {"model": self.model} if self.model else {}
+        try:
+            with metrics.timer("summarize_request"):
+                return await chat_completion(self.url, [
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": user_content}
+                ], max_tokens=max_tokens, **params) or None
+        except Exception as e:
+            logger.error(f"Error summarizing: {e}")
+            return None
+
+    async def summarize_one(self, text):
+        return await self.request(self.prompt.format(text=text), self.max_tokens)
+
+    async def summarize_batch(self, texts):
+        if len(texts) == 1:
+            return [await self.summarize_one(texts[0])]
+
+        items = "\n\n".join(f"[[{index}]] {text}" for index, text in enumerate(texts, start=1))
+        content = await self.request(self.batch_prompt.format(count=len(texts), items=items),
+                                     self.max_tokens * len(texts))
+        summaries = split_batch_response(content, len(texts)) if content else [None] * len(texts)
+
+        missing = [index for index, summary in enumerate(summaries) if summary is None]
+        if missing:
+            logger.warning(f"{len(missing)} of {len(texts)} summaries missing from the batched answer, "
+                           f"requesting them one by one")
+            for index, summary in zip(missing, await asyncio.gather(*(self.summarize_one(texts[i]) for i in missing))):
+                summaries[index] = summary
+        return summaries
+
+    def batcher(self):
+        loop = asyncio.get_running_loop()
+        if self._batcher is None or self._batcher[0] is not loop:
+            self._batcher = (loop, MicroBatcher(self.summarize_batch, self.batch_size))
+        return self._batcher[1]
+
+    async def apply(self, post):
+        text = post.data.get(self.source, "")
+        cache = translation.get_cache()
+        key = translation.cache_key(self.system_prompt + self.prompt, text, self.model)
+        summary = cache.get(key)
+        if summary is None:
+            summary = await self.batcher().submit(text)
+            if summary:
+                cache.put(key, summary)
+        post.data[self.output] = summary or self.fallback
+        return True
+
+BATCH_MARKER_PATTERN = r"\[\[(\d+)\]\]"
+
+def split_batch_response(content, count):
+    """The summary of each item in order; None for items missing from the answer"""
+    parts = re.split(BATCH_MARKER_PATTERN, content)
+    summaries = {}
+    for marker, text in zip(parts[1::2], parts[2::2]):
+        if text.strip():
+            summaries[int(marker)] = text.strip()
+    return [summaries.get(index) for index in range(1, count + 1)]
+
+class GenerateImage(Transform):
+    """
+    Have the image API draw a picture for posts without a cover image; its
+    URL goes into data[output] (None on failure).
+    """
+    name = "generate_image"
+
+    def __init__(self, url_template, prompt_template, output="default_image"):
+        self.url_template = url_template  # Format string with {prompt}
+        self.prompt_template = prompt_template  # Format string with {title}
+        self.output = output
+
+    async def apply(self, post):
+        post.data[self.output] = None
+        if post.data.get("cover_image"):
+            return True
+        try:
+            url = self.url_template.format(prompt=self.prompt_template.format(title=post.title))
+            response = await http_client.get(url, timeout=IMAGE_GENERATION_TIMEOUT)
+            response.raise_for_status()
+            post.data[self.output] = str(response.url)
+        except Exception as e:
+            logger.error(f"Error generating image: {e}")
+        return True
+
+class TopComments(Transform):
+    """The most liked comments of an API article into data["top_comments"]"""
+    name = "top_comments"
+    concurrency = FETCH_CONCURRENCY
+    limit_name = "fetch_article"
+
+    def __init__(self, url_template, count=5):
+        self.url_template = url_template  # Format string with the article id
+        self.count = count
+
+    async def apply(self, post):
+        try:
+            response = await http_client.get(self.url_template.format(post.data["article_id"]), timeout=ARTICLE_TIMEOUT)
+            response.raise_for_status()
+            comments = sorted(response.json(), key=lambda comment: comment.get("positive_reactions_count", 0),
+                              reverse=True)
+            post.data["top_comments"] = comments[:self.count]
+        except Exception as e:
+            logger.error(f"Error fetching comments: {e}")
+            post.data["top_comments"] = []
+        return True
@@ -0,0 +1,220 @@
+import sqlite3
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# --- Translation Cache Settings ---
+# Translations are stored on disk keyed by a hash of (prompt, model, source
+# text), both for whole articles and for single paragraphs. Reruns and retries
+# are served from the cache, and an edited article only sends the paragraphs
+# that actually changed to the AI API.
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", os.path.join("state", "translation_cache.sqlite3"))
+TRANSLATION_CACHE_MAX_BYTES = int(os.getenv("TRANSLATION_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL_DAYS", "30")) * 24 * 3600
+
+# --- Chunking Settings ---
+# Long articles are split on paragraph boundaries into token-bounded chunks
+# that are translated concurrently, so latency grows with the chunk size
+# rather than with the article length.
+TRANSLATION_CHUNK_TOKENS = int(os.getenv("TRANSLATION_CHUNK_TOKENS", "800"))
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+CHARS_PER_TOKEN = 4  # Rough estimate, good enough for English source text
+
+def cache_key(prompt, text, model=None):
+    """Content address of a translation: everything that affects the output"""
+    material = json.dumps([prompt, model or "", text], ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+def split_paragraphs(text, separator="\n\n"):
+    """Split text into its non-empty paragraphs"""
+    return [part.strip() for part in text.split(separator) if part.strip()]
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def pack_chunks(paragraphs, max_tokens=None):
+    """
+    Group consecutive paragraphs into (start, end) ranges of at most max_tokens
+    (TRANSLATION_CHUNK_TOKENS by default). A paragraph longer than the limit
+    gets a chunk of its own.
+    """
+    max_tokens = max_tokens or TRANSLATION_CHUNK_TOKENS
+    chunks = []
+    start = 0
+    tokens = 0
+    for index, paragraph in enumerate(paragraphs):
+        paragraph_tokens = estimate_tokens(paragraph)
+        if index > start and tokens + paragraph_tokens > max_tokens:
+            chunks.append((start, index))
+            start = index
+            tokens = 0
+        tokens += paragraph_tokens
+    if start < len(paragraphs):
+        chunks.append((start, len(paragraphs)))
+    return chunks
+
+class TranslationCache:
+    """Size-bounded LRU cache of translations with a TTL, stored in SQLite"""
+
+    def __init__(self, path=TRANSLATION_CACHE_PATH, max_bytes=TRANSLATION_CACHE_MAX_BYTES, ttl=TRANSLATION_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used);
+        """)
+        self.conn.execute("DELETE FROM translations WHERE created_at < ?", (time.time() - ttl,))
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, key):
+        """Return the cached translation, or None if missing or expired"""
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT value FROM translations WHERE key = ? AND created_at >= ?", (key, now - self.ttl)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE translations SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO translations (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value.encode('utf-8')), now, now)
+        )
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        (total,) = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM translations ORDER BY last_used"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM translations WHERE key = ?", victims)
+        logger.info(f"Evicted {len(victims)} cached translations ({freed} bytes)")
+
+_cache = None
+
+def get_cache():
+    """Return the shared translation cache, opening it on first use"""
+    global _cache
+    if _cache is None:
+        _cache = TranslationCache()
+    return _cache
+
+_limit = None
+
+def translation_limit():
+    """Semaphore capping concurrent translation requests on the running loop"""
+    global _limit
+    loop = asyncio.get_running_loop()
+    if _limit is None or _limit[0] is not loop:
+        _limit = (loop, asyncio.Semaphore(TRANSLATION_CONCURRENCY))
+    return _limit[1]
+
+def _missing_runs(translations):
+    """(start, end) ranges of consecutive paragraphs without a cached translation"""
+    runs = []
+    start = None
+    for index, translation in enumerate(translations):
+        if translation is None and start is None:
+            start = index
+        elif translation is not None and start is not None:
+            runs.append((start, index))
+            start = None
+    if start is not None:
+        runs.append((start, len(translations)))
+    return runs
+
+async def translate_cached(text, translate_fn, prompt, model=None, separator="\n\n", cache=None):
+    """
+    Translate text through the cache.
+
+    translate_fn is the uncached coroutine (text -> translation or None).
+    prompt is everything besides the source text that affects the output
+    (system prompt, instructions). Paragraphs with a cached translation are
+    reused; the remaining paragraphs are packed into token-bounded chunks that
+    are translated concurrently and reassembled in order.
+    Returns None if any request fails, so failures are never cached.
+    """
+    cache = cache or get_cache()
+    whole_key = cache_key(prompt, text, model)
+    cached = cache.get(whole_key)
+    if cached is not None:
+        logger.info("Translation served from cache")
+        return cached
+
+    paragraphs = split_paragraphs(text, separator)
+    if not paragraphs:
+        return None
+    translations = [cache.get(cache_key(prompt, paragraph, model)) for paragraph in paragraphs]
+
+    # Chunks never span a cached paragraph, so reassembly stays in order
+    chunks = []
+    for start, end in _missing_runs(translations):
+        chunks.extend((start + chunk_start, start + chunk_end)
+                      for chunk_start, chunk_end in pack_chunks(paragraphs[start:end]))
+    logger.info(f"Translating {len(paragraphs)} paragraphs: "
+                f"{len(paragraphs) - sum(end - start for start, end in chunks)} cached, {len(chunks)} chunk(s) to send")
+
+    limit = translation_limit()
+
+    async def translate_chunk(start, end):
+        chunk = separator.join(paragraphs[start:end])
+        chunk_key = cache_key(prompt, chunk, model)
+        result = cache.get(chunk_key)
+        if result is None:
+            async with limit:
+                result = await translate_fn(chunk)
+            if result:
+                cache.put(chunk_key, result)
+        return result
+
+    results = await asyncio.gather(*(translate_chunk(start, end) for start, end in chunks))
+
+    pieces = list(translations)
+    for (start, end), result in zip(chunks, results):
+        if not result:
+            return None
+        parts = split_paragraphs(result, separator)
+        if len(parts) == end - start:
+            # Paragraph structure survived translation, so cache paragraph by paragraph
+            for paragraph, part in zip(paragraphs[start:end], parts):
+                cache.put(cache_key(prompt, paragraph, model), part)
+            pieces[start:end] = parts
+        else:
+            pieces[start:end] = [result.strip()] + [""] * (end - start - 1)
+
+    translated = separator.join(piece for piece in pieces if piece)
+    cache.put(whole_key, translated)
+    return translated